@@ -1,37 +1,367 @@
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables from .env
-load_dotenv()
-
-# ─── Model & Feature Configuration ───
-MODEL_PATH = os.getenv("MODEL_PATH", "model.pkl")
-FEATURE_ORDER = [
-    "age",
-    "score",
-    "income",
-    # … other feature keys in training order …
-]
-
-# ─── Raw SQL Query Constants ───
-SQL_COUNT_APPLICATIONS_BY_GROUP = (
-    "SELECT COUNT(*) FROM applications "
-    "WHERE json_extract(features, '$.group') = :grp"
-)
-SQL_COUNT_APPROVED_BY_GROUP = (
-    "SELECT COUNT(*) FROM applications "
-    "WHERE json_extract(features, '$.group') = :grp AND decision='approved'"
-)
-SQL_SELECT_FEATURES_BY_ID = (
-    "SELECT features FROM applications "
-    "WHERE application_id = :id"
-)
-
-# ─── System Prompt Configuration ───
-PROMPT_PATH = Path(__file__).parent / "prompts" / "fairness_agent.txt"
-try:
-    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
-        SYSTEM_PROMPT = f.read()
-except FileNotFoundError:
-    SYSTEM_PROMPT = "You are FairnessAgent. Use function-calling with defined FUNCTIONS."
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables from .env
+load_dotenv()
+
+# ─── Logging Configuration ───
+# DEBUG also logs every request body and SQL statement; keep it off in production
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# ─── Model & Feature Configuration ───
+MODEL_PATH = os.getenv("MODEL_PATH", "model.pkl")
+# Model input columns in training order (compiled by features.FeatureSchema).
+# Numeric fields are validated against min/max; categorical fields are
+# ordinal-encoded by their position in `categories`. A missing key takes the
+# field's `default`; fields without one are required at ingest.
+# Counterfactual search never changes `immutable` fields and rounds
+# `integer` ones to whole numbers.
+FEATURE_SPEC = [
+    {"name": "age", "type": "numeric", "default": 0, "min": 0, "max": 120, "integer": True, "immutable": True},
+    {"name": "score", "type": "numeric", "default": 0, "min": 0, "max": 1000, "integer": True},
+    {"name": "income", "type": "numeric", "default": 0, "min": 0},
+    {"name": "loan_amount", "type": "numeric", "default": 0, "min": 0},
+    {"name": "loan_duration_months", "type": "numeric", "default": 0, "min": 0, "max": 480, "integer": True},
+    {"name": "employment_length_years", "type": "numeric", "default": 0, "min": 0, "max": 80, "integer": True},
+    {"name": "loan_purpose", "type": "categorical", "default": "other",
+     "categories": ["car", "home", "education", "other"]},
+    {"name": "education_level", "type": "categorical", "default": "HS",
+     "categories": ["HS", "Bachelors", "Masters", "PhD"]},
+    # Unlisted zipcodes are accepted and encoded as -1
+    {"name": "zipcode", "type": "categorical", "default": "00000", "allow_unknown": True, "immutable": True,
+     "categories": ["00000", "98101", "10001", "60601", "90210"]},
+]
+FEATURE_ORDER = [field["name"] for field in FEATURE_SPEC]
+
+# ─── Raw SQL Query Constants ───
+SQL_COUNT_APPLICATIONS_BY_GROUP = (
+    "SELECT COUNT(*) FROM applications "
+    "WHERE json_extract(features, '$.group') = :grp"
+)
+SQL_COUNT_APPROVED_BY_GROUP = (
+    "SELECT COUNT(*) FROM applications "
+    "WHERE json_extract(features, '$.group') = :grp AND decision='approved'"
+)
+SQL_SELECT_FEATURES_BY_ID = (
+    "SELECT features FROM applications "
+    "WHERE application_id = :id"
+)
+SQL_COUNT_BY_GROUP = (
+    "SELECT json_extract(features, '$.group') AS grp, COUNT(*), "
+    "SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END) "
+    "FROM applications GROUP BY grp"
+)
+SQL_SELECT_FEATURES_PAGE = (
+    "SELECT id, application_id, features FROM applications "
+    "WHERE id > :after_id ORDER BY id LIMIT :limit"
+)
+SQL_SELECT_FEATURES_BY_IDS = (
+    "SELECT id, application_id, features FROM applications "
+    "WHERE application_id IN :ids"
+)
+SQL_COUNT_ALL_APPLICATIONS = "SELECT COUNT(*) FROM applications"
+# Incremental SHAP summaries: claim an application once, then add to the running sums
+SQL_CLAIM_EXPLAINED = (
+    "INSERT INTO shap_explained (model_version, mode, application_id) "
+    "VALUES (:model_version, :mode, :application_id) "
+    "ON CONFLICT (model_version, mode, application_id) DO NOTHING"
+)
+SQL_UPSERT_SHAP_SUMMARY = (
+    "INSERT INTO shap_summaries (model_version, mode, grp, feature, n, sum_abs, sum_signed) "
+    "VALUES (:model_version, :mode, :grp, :feature, :n, :sum_abs, :sum_signed) "
+    "ON CONFLICT (model_version, mode, grp, feature) DO UPDATE SET "
+    "n = shap_summaries.n + excluded.n, "
+    "sum_abs = shap_summaries.sum_abs + excluded.sum_abs, "
+    "sum_signed = shap_summaries.sum_signed + excluded.sum_signed"
+)
+SQL_SELECT_SHAP_SUMMARY = (
+    "SELECT grp, feature, n, sum_abs, sum_signed FROM shap_summaries "
+    "WHERE model_version = :model_version AND mode = :mode"
+)
+# Tables from before summaries were keyed by model version and mode; they
+# only hold derived totals, so they are dropped and rebuilt
+SQL_DROP_UNVERSIONED_SHAP_TABLES = ["DROP TABLE shap_summaries", "DROP TABLE shap_explained"]
+# Background and validation rows for explanation-mode calibration: a random
+# sample of the newest :window rows, read backwards along the primary key
+SQL_SAMPLE_FEATURES = (
+    "SELECT features FROM (SELECT features FROM applications ORDER BY id DESC LIMIT :window) "
+    "ORDER BY RANDOM() LIMIT :limit"
+)
+# Bulk load with pre-encoded JSON features (used by the synthetic data generator)
+SQL_INSERT_APPLICATION_RAW = (
+    "INSERT INTO applications (application_id, features, decision, created_at) "
+    "VALUES (:application_id, :features, :decision, :created_at)"
+)
+# Write-behind ingest: duplicates are skipped, like the IntegrityError path
+SQL_INSERT_APPLICATION_IGNORE = (
+    "INSERT INTO applications (application_id, features, decision, created_at) "
+    "VALUES (:application_id, :features, NULL, :created_at) "
+    "ON CONFLICT (application_id) DO NOTHING"
+)
+# Listing and export: keyset pagination on id, with optional filters
+SQL_SELECT_APPLICATIONS = (
+    "SELECT id, application_id, decision, json_extract(features, '$.group') AS grp, "
+    "created_at, features FROM applications"
+)
+SQL_APPLICATION_FILTERS = {
+    "cursor": "id > :cursor",
+    "group": "json_extract(features, '$.group') = :group",
+    "decision": "decision = :decision",
+    "pending": "decision IS NULL",
+    "created_after": "created_at >= :created_after",
+    "created_before": "created_at < :created_before",
+}
+# Server default for timestamp columns: the text format SQLAlchemy's DateTime
+# binds ("YYYY-MM-DD HH:MM:SS.ffffff"), so range filters compare like with
+# like. CURRENT_TIMESTAMP would store "YYYY-MM-DD HH:MM:SS", which sorts
+# before the same instant written by the ORM or bound as a filter.
+SQL_UTCNOW_DEFAULT = "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+# Schema upgrades applied by init_db to databases created before these existed
+SQL_ADD_APPLICATIONS_CREATED_AT = "ALTER TABLE applications ADD COLUMN created_at DATETIME"
+# One-time migration (PRAGMA user_version 1): rewrite created_at values
+# stored without fractional seconds, and keep tables created with the old
+# CURRENT_TIMESTAMP default (which SQLite can't alter) from adding more
+SQL_CREATED_AT_FORMAT_VERSION = 1
+SQL_NORMALIZE_CREATED_AT = [
+    "UPDATE applications SET created_at = strftime('%Y-%m-%d %H:%M:%f000', created_at) "
+    "WHERE length(created_at) = 19",
+    "CREATE TRIGGER IF NOT EXISTS tr_applications_created_at_format AFTER INSERT ON applications "
+    "WHEN length(NEW.created_at) = 19 BEGIN "
+    "UPDATE applications SET created_at = strftime('%Y-%m-%d %H:%M:%f000', NEW.created_at) WHERE id = NEW.id; "
+    "END",
+]
+SQL_APPLICATION_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_applications_group ON applications (json_extract(features, '$.group'))",
+    "CREATE INDEX IF NOT EXISTS ix_applications_created_at ON applications (created_at)",
+]
+# Retention: roll the oldest month out of applications into application_summaries
+SQL_SELECT_OLDEST_APPLICATION = "SELECT MIN(created_at) AS oldest FROM applications"
+SQL_SELECT_EXPIRED_BATCH = (
+    "SELECT id, application_id, features, decision, created_at FROM applications "
+    "WHERE created_at < :end ORDER BY created_at, id LIMIT :limit"
+)
+SQL_SUMMARIZE_APPLICATIONS = (
+    "INSERT INTO application_summaries (month, grp, total, approved, denied) "
+    "SELECT :month, json_extract(features, '$.group') AS grp, COUNT(*), "
+    "SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END), "
+    "SUM(CASE WHEN decision='denied' THEN 1 ELSE 0 END) "
+    "FROM applications WHERE id IN :ids AND json_extract(features, '$.group') IS NOT NULL "
+    "GROUP BY grp "
+    "ON CONFLICT (month, grp) DO UPDATE SET "
+    "total = application_summaries.total + excluded.total, "
+    "approved = application_summaries.approved + excluded.approved, "
+    "denied = application_summaries.denied + excluded.denied"
+)
+SQL_DELETE_APPLICATIONS_BY_IDS = "DELETE FROM applications WHERE id IN :ids"
+# Take or renew the scheduled-maintenance lease; no row changes while another
+# worker holds an unexpired one
+SQL_CLAIM_MAINTENANCE_LEASE = (
+    "INSERT INTO maintenance_leases (name, owner, expires_at) VALUES (:name, :owner, :expires_at) "
+    "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+    "WHERE maintenance_leases.owner = excluded.owner OR maintenance_leases.expires_at <= :now"
+)
+# Hot rows plus rolled-up months, read in one statement so a rollup batch
+# committing mid-read can't be counted twice
+SQL_APPROVAL_COUNTS_FOR_GROUP = (
+    "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(approved), 0) FROM ("
+    "SELECT COUNT(*) AS total, SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END) AS approved "
+    "FROM applications WHERE json_extract(features, '$.group') = :grp "
+    "UNION ALL "
+    "SELECT total, approved FROM application_summaries WHERE grp = :grp)"
+)
+SQL_APPROVAL_COUNTS_BY_GROUP = (
+    "SELECT grp, SUM(total), SUM(approved) FROM ("
+    "SELECT json_extract(features, '$.group') AS grp, COUNT(*) AS total, "
+    "SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END) AS approved "
+    "FROM applications GROUP BY grp "
+    "UNION ALL "
+    "SELECT grp, total, approved FROM application_summaries) "
+    "WHERE grp IS NOT NULL GROUP BY grp"
+)
+# Fairness audit: one group at a time, optionally within a created_at window.
+# Summaries count for a window only for months that lie wholly inside it.
+SQL_AUDIT_GROUPS = (
+    "SELECT grp FROM ("
+    "SELECT DISTINCT json_extract(features, '$.group') AS grp FROM applications "
+    "UNION SELECT grp FROM application_summaries) "
+    "WHERE grp IS NOT NULL ORDER BY grp"
+)
+SQL_AUDIT_GROUP_COUNTS = (
+    "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(approved), 0) FROM ("
+    "SELECT COUNT(*) AS total, SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END) AS approved "
+    "FROM applications WHERE {hot_where} "
+    "UNION ALL "
+    "SELECT total, approved FROM application_summaries WHERE {summary_where})"
+)
+SQL_AUDIT_INTERSECTION = (
+    "SELECT json_extract(features, :path) AS value, COUNT(*), "
+    "SUM(CASE WHEN decision='approved' THEN 1 ELSE 0 END) "
+    "FROM applications WHERE {hot_where} GROUP BY value"
+)
+SQL_AUDIT_FILTERS = {
+    "group": "json_extract(features, '$.group') = :grp",
+    "since": "created_at >= :since",
+    "until": "created_at < :until",
+    "summary_group": "grp = :grp",
+    "summary_since": "month >= :since_month",
+    "summary_until": "month < :until_month",
+}
+# Prompt performance: agent run results, aggregated per prompt over a time window
+SQL_INSERT_PROMPT_RUN = (
+    "INSERT INTO prompt_runs (run_id, prompt_id, passed, trust_score, hallucination, failure_pattern, created_at) "
+    "VALUES (:run_id, :prompt_id, :passed, :trust_score, :hallucination, :failure_pattern, :created_at) "
+    "ON CONFLICT (run_id) DO NOTHING"
+)
+SQL_UPSERT_PROMPT_TEXT = (
+    "INSERT INTO prompts (prompt_id, prompt_text, updated_at) "
+    "VALUES (:prompt_id, :prompt_text, :updated_at) "
+    "ON CONFLICT (prompt_id) DO UPDATE SET "
+    "prompt_text = excluded.prompt_text, updated_at = excluded.updated_at"
+)
+SQL_PROMPT_RUN_FILTERS = {
+    "since": "created_at >= :since",
+    "until": "created_at < :until",
+    "prompt_id": "prompt_id = :prompt_id",
+}
+SQL_PROMPT_METRICS = (
+    "WITH windowed AS ("
+    "SELECT prompt_id, COUNT(*) AS total_runs, SUM(passed) AS passes, "
+    "SUM(hallucination) AS hallucinations, AVG(trust_score) AS trust_score, "
+    "AVG(passed) AS pass_rate, AVG(hallucination) AS hallucination_rate "
+    "FROM prompt_runs WHERE {where} GROUP BY prompt_id) "
+    "SELECT w.prompt_id, p.prompt_text, w.passes, w.total_runs - w.passes, w.trust_score, "
+    "w.hallucinations, w.total_runs, w.pass_rate, w.hallucination_rate, "
+    "CASE WHEN w.total_runs >= :min_runs AND (w.pass_rate < :min_pass_rate "
+    "OR w.trust_score < :min_trust_score OR w.hallucination_rate > :max_hallucination_rate) "
+    "THEN 1 ELSE 0 END "
+    "FROM windowed w LEFT JOIN prompts p ON p.prompt_id = w.prompt_id "
+    "ORDER BY w.pass_rate, w.trust_score"
+)
+SQL_PROMPT_FAILURE_PATTERNS = (
+    "SELECT prompt_id, failure_pattern, COUNT(*) AS n FROM prompt_runs "
+    "WHERE {where} AND failure_pattern IS NOT NULL "
+    "GROUP BY prompt_id, failure_pattern ORDER BY prompt_id, n DESC"
+)
+# Pass rate in the window after each active deployment against the window
+# before it; a recorded actual_improvement is used until enough runs exist
+SQL_PROMPT_REGRESSIONS = (
+    "WITH measured AS ("
+    "SELECT d.deployment_id, d.prompt_id, d.expected_improvement, d.actual_improvement AS recorded, "
+    "(SELECT AVG(r.passed) FROM prompt_runs r WHERE r.prompt_id = d.prompt_id "
+    "AND r.created_at >= datetime(d.deployed_at, :before) AND r.created_at < datetime(d.deployed_at)) AS rate_before, "
+    "(SELECT AVG(r.passed) FROM prompt_runs r WHERE r.prompt_id = d.prompt_id "
+    "AND r.created_at >= datetime(d.deployed_at) AND r.created_at < datetime(d.deployed_at, :after)) AS rate_after, "
+    "(SELECT COUNT(*) FROM prompt_runs r WHERE r.prompt_id = d.prompt_id "
+    "AND r.created_at >= datetime(d.deployed_at) AND r.created_at < datetime(d.deployed_at, :after)) AS runs_after "
+    "FROM prompt_deployments d WHERE d.status = 'active'), "
+    "scored AS ("
+    "SELECT deployment_id, prompt_id, expected_improvement, rate_before, rate_after, "
+    "CASE WHEN runs_after >= :min_runs AND rate_before IS NOT NULL "
+    "THEN rate_after - rate_before ELSE recorded END AS actual_improvement "
+    "FROM measured) "
+    "SELECT 'performance_regression', 'high', deployment_id, prompt_id, actual_improvement, "
+    "expected_improvement, rate_before, rate_after FROM scored "
+    "WHERE actual_improvement < :regression_threshold "
+    "UNION ALL "
+    "SELECT 'underperforming_optimization', 'medium', deployment_id, prompt_id, actual_improvement, "
+    "expected_improvement, rate_before, rate_after FROM scored "
+    "WHERE actual_improvement < expected_improvement * :underperformance_ratio "
+    "ORDER BY 3, 1"
+)
+
+# ─── System Prompt Configuration ───
+PROMPT_PATH = Path(__file__).parent / "prompts" / "fairness_agent.txt"
+try:
+    with open(PROMPT_PATH, "r", encoding="utf-8") as f:
+        SYSTEM_PROMPT = f.read()
+except FileNotFoundError:
+    SYSTEM_PROMPT = "You are FairnessAgent. Use function-calling with defined FUNCTIONS."
+
+# ─── Async Job Queue Configuration ───
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_CPU_THREADS = int(os.getenv("JOB_CPU_THREADS", "1"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+JOB_SWEEP_INTERVAL_SECONDS = float(os.getenv("JOB_SWEEP_INTERVAL_SECONDS", "300"))
+JOB_EXPLAIN_CHUNK_SIZE = int(os.getenv("JOB_EXPLAIN_CHUNK_SIZE", "500"))
+# Largest chunk_size a batch_explain job may ask for
+JOB_EXPLAIN_MAX_CHUNK_SIZE = int(os.getenv("JOB_EXPLAIN_MAX_CHUNK_SIZE", "5000"))
+
+# ─── Explanation Mode Configuration ───
+# Modes: "exact" (path-dependent TreeSHAP), "approximate" (Saabas),
+# "tree_limit" (first EXPLAIN_TREE_LIMIT trees; 0 = a quarter of them) and
+# "interventional" (against a cached background sample)
+EXPLAIN_DEFAULT_MODE = os.getenv("EXPLAIN_DEFAULT_MODE", "exact")
+EXPLAIN_TREE_LIMIT = int(os.getenv("EXPLAIN_TREE_LIMIT", "0"))
+EXPLAIN_BACKGROUND_SIZE = int(os.getenv("EXPLAIN_BACKGROUND_SIZE", "100"))
+EXPLAIN_VALIDATION_SIZE = int(os.getenv("EXPLAIN_VALIDATION_SIZE", "64"))
+EXPLAIN_CALIBRATION_TTL_SECONDS = float(os.getenv("EXPLAIN_CALIBRATION_TTL_SECONDS", "3600"))
+# Calibration samples from this many of the newest applications
+EXPLAIN_SAMPLE_WINDOW = int(os.getenv("EXPLAIN_SAMPLE_WINDOW", "10000"))
+
+# ─── Write-Behind Ingest Configuration ───
+# When enabled, /ingest requests are committed in group transactions by a
+# single writer task and acknowledged once their transaction commits
+INGEST_WRITE_BEHIND = os.getenv("INGEST_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_FLUSH_INTERVAL_MS = float(os.getenv("INGEST_FLUSH_INTERVAL_MS", "5"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "10000"))
+
+# ─── Application Listing & Export Configuration ───
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+# Rows fetched per server-side cursor round trip while exporting
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# ─── Counterfactual Search Configuration ───
+COUNTERFACTUAL_TIME_BUDGET_MS = float(os.getenv("COUNTERFACTUAL_TIME_BUDGET_MS", "500"))
+COUNTERFACTUAL_MAX_TIME_BUDGET_MS = float(os.getenv("COUNTERFACTUAL_MAX_TIME_BUDGET_MS", "5000"))
+# Candidates scored per predict_proba call
+COUNTERFACTUAL_BATCH_SIZE = int(os.getenv("COUNTERFACTUAL_BATCH_SIZE", "512"))
+COUNTERFACTUAL_MAX_ITERATIONS = int(os.getenv("COUNTERFACTUAL_MAX_ITERATIONS", "50"))
+# Most features a single candidate may change
+COUNTERFACTUAL_MAX_CHANGES = int(os.getenv("COUNTERFACTUAL_MAX_CHANGES", "3"))
+# Most counterfactuals returned per search
+COUNTERFACTUAL_MAX_RESULTS = int(os.getenv("COUNTERFACTUAL_MAX_RESULTS", "20"))
+
+# ─── Request Profiling Configuration ───
+# The profiling middleware is only installed when PROFILING_ENABLED is set
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.0"))
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling")  # "sampling" or "cprofile"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# ─── Retention & Maintenance Configuration ───
+# With RETENTION_ENABLED, applications older than RETENTION_HOT_MONTHS whole
+# months are rolled, a month at a time, into per-month, per-group approval
+# counts. The rows themselves are kept in one SQLite file per month under
+# RETENTION_ARCHIVE_DIR (empty: not kept).
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "0").lower() in ("1", "true", "yes")
+RETENTION_HOT_MONTHS = int(os.getenv("RETENTION_HOT_MONTHS", "12"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "archive")
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+# One worker holds the maintenance lease; others take over this long after it lapses
+MAINTENANCE_LEASE_SECONDS = float(os.getenv("MAINTENANCE_LEASE_SECONDS", str(2 * MAINTENANCE_INTERVAL_SECONDS)))
+# Pages freed per incremental_vacuum step; ingest can write between steps
+VACUUM_STEP_PAGES = int(os.getenv("VACUUM_STEP_PAGES", "512"))
+# Write-ahead logging lets readers and the maintenance task run alongside ingest
+SQLITE_WAL = os.getenv("SQLITE_WAL", "1").lower() in ("1", "true", "yes")
+
+# ─── Prompt Performance Configuration ───
+# A prompt needs optimization once it has PROMPT_MIN_RUNS runs in the window
+# and misses any of these thresholds
+PROMPT_MIN_PASS_RATE = float(os.getenv("PROMPT_MIN_PASS_RATE", "0.85"))
+PROMPT_MIN_TRUST_SCORE = float(os.getenv("PROMPT_MIN_TRUST_SCORE", "0.70"))
+PROMPT_MAX_HALLUCINATION_RATE = float(os.getenv("PROMPT_MAX_HALLUCINATION_RATE", "0.10"))
+PROMPT_MIN_RUNS = int(os.getenv("PROMPT_MIN_RUNS", "10"))
+PROMPT_METRICS_WINDOW_HOURS = float(os.getenv("PROMPT_METRICS_WINDOW_HOURS", "24"))
+# Deployment alerts: a pass-rate change below PROMPT_REGRESSION_THRESHOLD is a
+# regression; below PROMPT_UNDERPERFORMANCE_RATIO x expected, underperforming
+PROMPT_REGRESSION_THRESHOLD = float(os.getenv("PROMPT_REGRESSION_THRESHOLD", "-0.05"))
+PROMPT_UNDERPERFORMANCE_RATIO = float(os.getenv("PROMPT_UNDERPERFORMANCE_RATIO", "0.5"))
+PROMPT_RUNS_MAX_BATCH = int(os.getenv("PROMPT_RUNS_MAX_BATCH", "1000"))
@@ -0,0 +1,44 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+
+import pytest
+
+# Point the service at a throwaway database before any app module is imported
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="nokware-test-"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+# Bind the engine now, so modules that rewrite DATABASE_URL at import can't redirect it
+import database  # noqa: E402,F401
+
+API_HEADERS = {"x-api-key": "secret-key"}
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def seed_applications(client):
+    """Insert (application_id, features, decision) rows straight into the test DB."""
+    def seed(rows):
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.executemany(
+                "INSERT INTO applications (application_id, features, decision) VALUES (?, ?, ?)",
+                [(app_id, json.dumps(features), decision) for app_id, features, decision in rows]
+            )
+    return seed
+
+def wait_for_job(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(f"/jobs/{job_id}", headers=API_HEADERS).json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish within {timeout}s")
@@ -0,0 +1,228 @@
+import time
+
+from config import (
+    COUNTERFACTUAL_BATCH_SIZE,
+    COUNTERFACTUAL_MAX_ITERATIONS,
+    COUNTERFACTUAL_MAX_CHANGES,
+    COUNTERFACTUAL_MAX_RESULTS,
+)
+from features import FEATURE_SCHEMA
+
+# Interpolation points tried between the original and a flip
+LINE_SEARCH_STEPS = 20
+# Flips refined per iteration
+REFINE_TOP = 32
+# Radius (in units of each feature's scale) of the first proposals, and its cap
+START_RADIUS = 0.05
+MAX_RADIUS = 2.0
+# Iterations without a nearer flip before stopping early
+PATIENCE = 5
+
+class CounterfactualSearch:
+    """
+    Finds small, feasible changes to one application's feature vector that
+    change the model's prediction. Each iteration scores a batch of random
+    perturbations with one predict_proba call; flips are then pulled back
+    toward the original by a batched line search and by reverting changes
+    that aren't needed. Candidates stay within the FEATURE_SPEC bounds and
+    never touch immutable fields.
+    """
+    def __init__(
+        self,
+        model,
+        schema=FEATURE_SCHEMA,
+        batch_size: int = COUNTERFACTUAL_BATCH_SIZE,
+        max_iterations: int = COUNTERFACTUAL_MAX_ITERATIONS,
+        max_changes: int = COUNTERFACTUAL_MAX_CHANGES,
+    ):
+        import numpy as np
+
+        self.model = model
+        self.schema = schema
+        self.batch_size = batch_size
+        self.max_iterations = max_iterations
+        self.max_changes = max_changes
+
+        spec = schema.spec
+        self.numeric = np.array([f["type"] == "numeric" for f in spec])
+        self.integer = np.array([bool(f.get("integer")) for f in spec])
+        self.mutable = np.array([not f.get("immutable") for f in spec])
+        self.low = np.array([f.get("min", -np.inf) if f["type"] == "numeric" else 0.0 for f in spec])
+        self.high = np.array([
+            f.get("max", np.inf) if f["type"] == "numeric" else len(f["categories"]) - 1.0
+            for f in spec
+        ])
+
+    # ─── Vectorized Helpers ───
+    def _scale(self, x0):
+        import numpy as np
+
+        bounded = np.isfinite(self.low) & np.isfinite(self.high) & (self.high > self.low)
+        return np.where(bounded, self.high - self.low, np.maximum(np.abs(x0), 1.0))
+
+    def _feasible(self, C, x0):
+        import numpy as np
+
+        C = np.clip(C, self.low, self.high)
+        C = np.where(self.integer, np.round(C), C)
+        # Immutable values may lie outside the bounds (an unknown zipcode is -1)
+        return np.where(self.mutable, C, x0)
+
+    def _distance(self, C, x0, scale):
+        """L1 distance with numerics in units of scale and 1 per changed category."""
+        import numpy as np
+
+        diff = np.abs(C - x0)
+        return np.where(self.numeric, diff / scale, diff > 0).sum(axis=1)
+
+    def _propose(self, rng, x0, scale, radius, mutable_idx):
+        import numpy as np
+
+        k, n = self.batch_size, len(x0)
+        # Each candidate changes a random subset of 1..max_changes mutable features
+        max_changes = min(self.max_changes, len(mutable_idx))
+        n_changes = rng.integers(1, max_changes + 1, size=k)
+        rank = np.argsort(np.argsort(rng.random((k, len(mutable_idx))), axis=1), axis=1)
+        change = np.zeros((k, n), dtype=bool)
+        change[:, mutable_idx] = rank < n_changes[:, None]
+
+        proposed = x0 + rng.normal(0.0, radius, (k, n)) * scale
+        for j in np.flatnonzero(~self.numeric):
+            proposed[:, j] = rng.integers(0, int(self.high[j]) + 1, size=k)
+        return self._feasible(np.where(change, proposed, x0), x0)
+
+    def _predict(self, C):
+        import numpy as np
+
+        return self.model.predict_proba(C.astype(np.float32))
+
+    def _refine(self, F, x0, scale, is_flip):
+        """Shrink each flip toward x0, then drop the changes it doesn't need."""
+        import numpy as np
+
+        m, n = F.shape
+        alphas = np.linspace(1.0 / LINE_SEARCH_STEPS, 1.0, LINE_SEARCH_STEPS)
+        # Categorical changes can't be interpolated, so they stay as in the flip
+        steps = np.where(self.numeric, x0 + alphas[:, None, None] * (F - x0), F)
+        steps = self._feasible(steps.transpose(1, 0, 2).reshape(m * LINE_SEARCH_STEPS, n), x0)
+        ok = is_flip(self._predict(steps)).reshape(m, LINE_SEARCH_STEPS)
+        ok[:, -1] |= ~ok.any(axis=1)  # keep the flip itself if rounding broke every step
+        F = steps.reshape(m, LINE_SEARCH_STEPS, n)[np.arange(m), ok.argmax(axis=1)]
+
+        for _ in range(self.max_changes):
+            changed = F != x0
+            rows, cols = np.nonzero(changed)
+            if not len(rows):
+                break
+            reverted = F[rows].copy()
+            reverted[np.arange(len(rows)), cols] = x0[cols]
+            keep = is_flip(self._predict(reverted))
+            if not keep.any():
+                break
+            gain = np.where(keep, self._distance(F[rows], x0, scale) - self._distance(reverted, x0, scale), -np.inf)
+            best = np.full(m, -np.inf)
+            np.maximum.at(best, rows, gain)
+            pick = keep & (gain == best[rows]) & np.isfinite(gain)
+            # One revert per flip per pass
+            _, first = np.unique(rows[pick], return_index=True)
+            chosen = np.flatnonzero(pick)[first]
+            F[rows[chosen]] = reverted[chosen]
+        return F
+
+    # ─── Search ───
+    def search(self, x0, time_budget_ms: float, desired_class=None, max_results: int = 3, seed=None) -> dict:
+        """
+        Blocking; run in a threadpool. `x0` is a FEATURE_SCHEMA vector. The
+        deadline is checked between predict_proba calls, so the search
+        overruns the budget by at most one iteration.
+        """
+        import numpy as np
+
+        if not isinstance(max_results, int) or not 1 <= max_results <= COUNTERFACTUAL_MAX_RESULTS:
+            raise ValueError(f"max_results must be between 1 and {COUNTERFACTUAL_MAX_RESULTS}, got {max_results!r}")
+        start = time.perf_counter()
+        deadline = start + time_budget_ms / 1000.0
+        rng = np.random.default_rng(seed)
+        x0 = np.asarray(x0, dtype=np.float64).reshape(-1)
+        classes = list(self.model.classes_)
+        labels = [str(c) for c in classes]
+
+        p0 = self._predict(x0[None])[0]
+        original = int(p0.argmax())
+        if desired_class is not None and str(desired_class) not in labels:
+            raise ValueError(f"Unknown class {desired_class!r}; model classes are {labels}")
+        target = labels.index(str(desired_class)) if desired_class is not None else None
+
+        def is_flip(P):
+            pred = P.argmax(axis=1)
+            return pred == target if target is not None else pred != original
+
+        result = {
+            "original_class": labels[original],
+            "probability": float(p0[original]),
+            "counterfactuals": [],
+            "evaluated": 1,
+            "iterations": 0,
+            "budget_exhausted": False,
+        }
+        mutable_idx = np.flatnonzero(self.mutable)
+        if len(classes) < 2 or target == original or not len(mutable_idx):
+            result["elapsed_ms"] = round(1000 * (time.perf_counter() - start), 3)
+            return result
+
+        scale = self._scale(x0)
+        # Nearest flip per set of changed features, so results are distinct options
+        pool = {}
+        radius = START_RADIUS
+        stale = 0
+        while result["iterations"] < self.max_iterations:
+            if time.perf_counter() >= deadline:
+                result["budget_exhausted"] = True
+                break
+            result["iterations"] += 1
+            C = self._propose(rng, x0, scale, radius, mutable_idx)
+            flips = is_flip(self._predict(C))
+            result["evaluated"] += len(C)
+
+            improved = False
+            if flips.any():
+                F = C[flips]
+                F = F[np.argsort(self._distance(F, x0, scale))[:REFINE_TOP]]
+                F = self._refine(F, x0, scale, is_flip)
+                for row, dist in zip(F, self._distance(F, x0, scale)):
+                    key = tuple(np.flatnonzero(row != x0))
+                    if key not in pool or dist < pool[key][0] - 1e-12:
+                        pool[key] = (float(dist), row)
+                        improved = True
+            else:
+                # Nothing flipped yet: look further out
+                radius = min(radius * 2.0, MAX_RADIUS)
+
+            stale = 0 if improved else stale + 1
+            if len(pool) >= max_results and stale >= PATIENCE:
+                break
+
+        best = sorted(pool.values(), key=lambda item: item[0])[:max_results]
+        if best:
+            probabilities = self._predict(np.array([row for _, row in best]))
+            result["evaluated"] += len(best)
+        for (dist, row), p in zip(best, probabilities if best else []):
+            predicted = int(p.argmax())
+            result["counterfactuals"].append({
+                "changes": {
+                    self.schema.names[j]: {"from": self._decode(j, x0[j]), "to": self._decode(j, row[j])}
+                    for j in np.flatnonzero(row != x0)
+                },
+                "distance": round(dist, 6),
+                "predicted_class": labels[predicted],
+                "probability": float(p[predicted]),
+            })
+        result["elapsed_ms"] = round(1000 * (time.perf_counter() - start), 3)
+        return result
+
+    def _decode(self, j: int, value: float):
+        field = self.schema.spec[j]
+        if field["type"] == "categorical":
+            categories = field["categories"]
+            return categories[int(value)] if 0 <= value < len(categories) else None
+        return int(value) if field.get("integer") else float(value)
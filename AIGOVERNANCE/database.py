@@ -1,21 +1,81 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from models import Base
-
-DATABASE_URL = "sqlite+aiosqlite:///./nokware.db"
-
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # logs SQL for debugging
-)
-
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
-
-async def init_db():
-    # Create tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+import os
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from models import Base
+from config import (
+    SQL_ADD_APPLICATIONS_CREATED_AT,
+    SQL_CREATED_AT_FORMAT_VERSION,
+    SQL_NORMALIZE_CREATED_AT,
+    SQL_APPLICATION_INDEXES,
+    SQL_DROP_UNVERSIONED_SHAP_TABLES,
+    SQLITE_WAL,
+)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./nokware.db")
+
+# Per-statement SQL echo is expensive; enable with SQL_ECHO=1 for debugging only
+SQL_ECHO = os.getenv("SQL_ECHO", "0").lower() in ("1", "true", "yes")
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=SQL_ECHO,
+)
+
+def enable_sqlite_pragmas(async_engine):
+    """
+    Set WAL and incremental auto-vacuum on every new connection. auto_vacuum
+    only takes effect on a new database file (or after a full VACUUM); see
+    retention.compact.
+    """
+    if async_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+enable_sqlite_pragmas(engine)
+
+AsyncSessionLocal = sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+def upgrade_schema(conn):
+    """
+    Bring tables created by older versions up to date (sync connection).
+    Data migrations run once per database file, tracked in PRAGMA
+    user_version, so worker starts after the first don't scan the table.
+    """
+    inspector = inspect(conn)
+    columns = {col["name"] for col in inspector.get_columns("applications")}
+    if "created_at" not in columns:
+        conn.execute(text(SQL_ADD_APPLICATIONS_CREATED_AT))
+    if inspector.has_table("shap_summaries") and "model_version" not in {
+        col["name"] for col in inspector.get_columns("shap_summaries")
+    }:
+        for ddl in SQL_DROP_UNVERSIONED_SHAP_TABLES:
+            conn.execute(text(ddl))
+        Base.metadata.create_all(conn, tables=[
+            Base.metadata.tables["shap_summaries"], Base.metadata.tables["shap_explained"]
+        ])
+    if conn.dialect.name == "sqlite":
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version < SQL_CREATED_AT_FORMAT_VERSION:
+            for statement in SQL_NORMALIZE_CREATED_AT:
+                conn.execute(text(statement))
+            conn.exec_driver_sql(f"PRAGMA user_version = {SQL_CREATED_AT_FORMAT_VERSION}")
+    for ddl in SQL_APPLICATION_INDEXES:
+        conn.execute(text(ddl))
+
+async def init_db():
+    # Create tables, then upgrade ones that already existed
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
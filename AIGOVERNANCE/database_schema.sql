@@ -1,45 +1,66 @@
--- Core performance tracking
-CREATE TABLE prompt_performance_log (
-  id SERIAL PRIMARY KEY,
-  prompt_id VARCHAR(255) NOT NULL,
-  prompt_text TEXT NOT NULL,
-  pass_rate DECIMAL(5,4) NOT NULL,
-  trust_score DECIMAL(5,4) NOT NULL,
-  hallucination_rate DECIMAL(5,4) NOT NULL,
-  total_runs INTEGER NOT NULL,
-  failure_patterns JSONB,
-  analyzed_at TIMESTAMP DEFAULT NOW(),
-  INDEX idx_prompt_perf_id_time (prompt_id, analyzed_at),
-  INDEX idx_prompt_perf_rates (pass_rate, trust_score)
-);
-
--- Optimization results
-CREATE TABLE prompt_optimizations (
-  id SERIAL PRIMARY KEY,
-  prompt_id VARCHAR(255) NOT NULL,
-  original_prompt TEXT NOT NULL,
-  optimized_prompt TEXT NOT NULL,
-  optimization_strategy VARCHAR(100) NOT NULL,
-  original_pass_rate DECIMAL(5,4) NOT NULL,
-  original_trust_score DECIMAL(5,4) NOT NULL,
-  generated_at TIMESTAMP DEFAULT NOW(),
-  status VARCHAR(50) DEFAULT 'ready_for_testing',
-  version VARCHAR(50) NOT NULL,
-  approval_notes TEXT,
-  INDEX idx_opt_status_time (status, generated_at)
-);
-
--- Deployment tracking
-CREATE TABLE prompt_deployments (
-  id SERIAL PRIMARY KEY,
-  deployment_id VARCHAR(255) UNIQUE NOT NULL,
-  prompt_id VARCHAR(255) NOT NULL,
-  deployed_version VARCHAR(50) NOT NULL,
-  deployment_type VARCHAR(50) NOT NULL,
-  deployed_at TIMESTAMP DEFAULT NOW(),
-  status VARCHAR(50) DEFAULT 'active',
-  expected_improvement DECIMAL(5,4),
-  actual_improvement DECIMAL(5,4),
-  rollback_at TIMESTAMP,
-  INDEX idx_deploy_status_time (status, deployed_at)
+-- Core performance tracking
+CREATE TABLE prompt_performance_log (
+  id SERIAL PRIMARY KEY,
+  prompt_id VARCHAR(255) NOT NULL,
+  prompt_text TEXT NOT NULL,
+  pass_rate DECIMAL(5,4) NOT NULL,
+  trust_score DECIMAL(5,4) NOT NULL,
+  hallucination_rate DECIMAL(5,4) NOT NULL,
+  total_runs INTEGER NOT NULL,
+  failure_patterns JSONB,
+  analyzed_at TIMESTAMP DEFAULT NOW(),
+  INDEX idx_prompt_perf_id_time (prompt_id, analyzed_at),
+  INDEX idx_prompt_perf_rates (pass_rate, trust_score)
+);
+
+-- Optimization results
+CREATE TABLE prompt_optimizations (
+  id SERIAL PRIMARY KEY,
+  prompt_id VARCHAR(255) NOT NULL,
+  original_prompt TEXT NOT NULL,
+  optimized_prompt TEXT NOT NULL,
+  optimization_strategy VARCHAR(100) NOT NULL,
+  original_pass_rate DECIMAL(5,4) NOT NULL,
+  original_trust_score DECIMAL(5,4) NOT NULL,
+  generated_at TIMESTAMP DEFAULT NOW(),
+  status VARCHAR(50) DEFAULT 'ready_for_testing',
+  version VARCHAR(50) NOT NULL,
+  approval_notes TEXT,
+  INDEX idx_opt_status_time (status, generated_at)
+);
+
+-- Deployment tracking
+CREATE TABLE prompt_deployments (
+  id SERIAL PRIMARY KEY,
+  deployment_id VARCHAR(255) UNIQUE NOT NULL,
+  prompt_id VARCHAR(255) NOT NULL,
+  deployed_version VARCHAR(50) NOT NULL,
+  deployment_type VARCHAR(50) NOT NULL,
+  deployed_at TIMESTAMP DEFAULT NOW(),
+  status VARCHAR(50) DEFAULT 'active',
+  expected_improvement DECIMAL(5,4),
+  actual_improvement DECIMAL(5,4),
+  rollback_at TIMESTAMP,
+  INDEX idx_deploy_status_time (status, deployed_at)
+);
+
+-- Agent run results, aggregated by GET /prompt-metrics
+CREATE TABLE prompt_runs (
+  id SERIAL PRIMARY KEY,
+  run_id VARCHAR(255) UNIQUE,
+  prompt_id VARCHAR(255) NOT NULL,
+  passed BOOLEAN NOT NULL,
+  trust_score DECIMAL(5,4) NOT NULL,
+  hallucination BOOLEAN NOT NULL DEFAULT FALSE,
+  failure_pattern TEXT,
+  created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  INDEX ix_prompt_runs_prompt_time (prompt_id, created_at),
+  INDEX ix_prompt_runs_created_at (created_at)
+);
+
+-- Latest text of each prompt
+CREATE TABLE prompts (
+  prompt_id VARCHAR(255) PRIMARY KEY,
+  prompt_text TEXT NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
\ No newline at end of file
@@ -1,109 +1,321 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy import text
-from starlette.concurrency import run_in_threadpool
-import numpy as np
-import json
-
-from config import (
-    FEATURE_ORDER,
-    SQL_COUNT_APPLICATIONS_BY_GROUP,
-    SQL_COUNT_APPROVED_BY_GROUP,
-    SQL_SELECT_FEATURES_BY_ID,
-    SYSTEM_PROMPT
-)
-from schemas import (
-    IngestRequest, IngestResponse,
-    DisparateImpactRequest, DisparateImpactResponse,
-    ExplainRequest, ExplainResponse,
-    AgentRequest, AgentResponse
-)
-from database import AsyncSessionLocal
-from model import Application as ApplicationModel
-from tools import call_tool
-
-router = APIRouter()
-
-async def get_session() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
-        yield session
-
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest_endpoint(
-    req: IngestRequest,
-    session: AsyncSession = Depends(get_session)
-):
-    app_model = ApplicationModel(
-        application_id=req.application_id,
-        features=req.features,
-        decision=None
-    )
-    session.add(app_model)
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-    return IngestResponse(status="success")
-
-@router.get("/bias/disparate-impact", response_model=DisparateImpactResponse)
-async def disparate_impact_endpoint(
-    privileged: str,
-    unprivileged: str,
-    session: AsyncSession = Depends(get_session)
-):
-    total_priv = (await session.execute(
-        text(SQL_COUNT_APPLICATIONS_BY_GROUP), {"grp": privileged}
-    )).scalar() or 0
-    total_unpriv = (await session.execute(
-        text(SQL_COUNT_APPLICATIONS_BY_GROUP), {"grp": unprivileged}
-    )).scalar() or 0
-    hired_priv = (await session.execute(
-        text(SQL_COUNT_APPROVED_BY_GROUP), {"grp": privileged}
-    )).scalar() or 0
-    hired_unpriv = (await session.execute(
-        text(SQL_COUNT_APPROVED_BY_GROUP), {"grp": unprivileged}
-    )).scalar() or 0
-    rate_priv = hired_priv / total_priv if total_priv else 0
-    rate_unpriv = hired_unpriv / total_unpriv if total_unpriv else 0
-    ratio = rate_unpriv / rate_priv if rate_priv else 0
-    return DisparateImpactResponse(ratio=ratio)
-
-@router.post("/explain", response_model=ExplainResponse)
-async def explain_endpoint(
-    req: ExplainRequest,
-    request: Request,
-    session: AsyncSession = Depends(get_session)
-):
-    explainer = request.app.state.explainer
-    if explainer is None:
-        raise HTTPException(status_code=503, detail="Explanation service unavailable")
-
-    result = await session.execute(
-        text(SQL_SELECT_FEATURES_BY_ID), {"id": req.application_id}
-    )
-    row = result.first()
-    if not row:
-        raise HTTPException(status_code=404, detail="Application not found")
-
-    raw = row[0]
-    try:
-        features = json.loads(raw) if isinstance(raw, str) else raw
-    except ValueError:
-        raise HTTPException(status_code=500, detail="Invalid features JSON")
-
-    x = [features.get(key, 0) for key in FEATURE_ORDER]
-    X = np.array([x])
-    shap_values = await run_in_threadpool(explainer.shap_values, X)
-    contributions = {key: float(val) for key, val in zip(FEATURE_ORDER, shap_values[0])}
-    return ExplainResponse(contributions=contributions)
-
-@router.post("/agent", response_model=AgentResponse)
-async def agent_endpoint(
-    req: AgentRequest
-):
-    response = await call_tool("agent_dispatch", {"messages": [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user",   "content": req.prompt}
-    ]})
-    return AgentResponse(**response)
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from config import (
+    SQL_SELECT_FEATURES_BY_ID,
+    SYSTEM_PROMPT,
+    COUNTERFACTUAL_TIME_BUDGET_MS,
+    COUNTERFACTUAL_MAX_TIME_BUDGET_MS,
+    LIST_DEFAULT_LIMIT,
+    LIST_MAX_LIMIT,
+    PROMPT_RUNS_MAX_BATCH,
+    EXPLAIN_DEFAULT_MODE
+)
+from schemas import (
+    IngestRequest, IngestResponse,
+    ApplicationPage,
+    DisparateImpactRequest, DisparateImpactResponse,
+    ExplainRequest, ExplainResponse, ExplainMode, CalibrationResponse,
+    FeatureImportanceResponse,
+    CounterfactualRequest, CounterfactualResponse,
+    AgentRequest, AgentResponse,
+    JobRequest, JobResponse,
+    PromptRunsRequest, PromptRunsResponse, PromptMetrics, PromptRegressionAlert
+)
+from database import AsyncSessionLocal
+from model import Application as ApplicationModel
+from tools import call_tool
+from jobs import QueueFullError
+from features import FEATURE_SCHEMA, FeatureValidationError
+from metrics import stage_timer
+from importance import load_summary, safe_record_explanations
+from retention import approval_counts
+from prompt_metrics import record_runs, load_metrics, load_regressions
+from listing import list_page, stream_export, parquet_available, EXPORT_FORMATS
+from profiling import list_profiles, profile_path
+
+router = APIRouter()
+
+async def get_session() -> AsyncSession:
+    async with AsyncSessionLocal() as session:
+        yield session
+
+@router.post("/ingest", response_model=IngestResponse)
+async def ingest_endpoint(
+    req: IngestRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_session)
+):
+    try:
+        FEATURE_SCHEMA.validate(req.features)
+    except FeatureValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    buffer = getattr(request.app.state, "ingest_buffer", None)
+    if buffer is not None:
+        await buffer.submit(req.application_id, req.features)
+        return IngestResponse(status="success")
+    app_model = ApplicationModel(
+        application_id=req.application_id,
+        features=req.features,
+        decision=None
+    )
+    session.add(app_model)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+    return IngestResponse(status="success")
+
+@router.get("/applications", response_model=ApplicationPage)
+async def list_applications_endpoint(
+    group: Optional[str] = None,
+    decision: Optional[str] = Query(None, description='"approved", "denied" or "pending"'),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    session: AsyncSession = Depends(get_session)
+):
+    with stage_timer("db_fetch"):
+        page = await list_page(
+            session, limit, group=group, decision=decision,
+            created_after=created_after, created_before=created_before, cursor=cursor
+        )
+    return ApplicationPage(**page)
+
+@router.get("/applications/export")
+async def export_applications_endpoint(
+    format: str = Query("ndjson", description="ndjson, csv or parquet"),
+    group: Optional[str] = None,
+    decision: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow on the server")
+    extension = "json" if format == "ndjson" else format
+    return StreamingResponse(
+        stream_export(
+            AsyncSessionLocal, format, group=group, decision=decision,
+            created_after=created_after, created_before=created_before
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="applications.{extension}"'}
+    )
+
+@router.get("/bias/disparate-impact", response_model=DisparateImpactResponse)
+async def disparate_impact_endpoint(
+    privileged: str,
+    unprivileged: str,
+    session: AsyncSession = Depends(get_session)
+):
+    with stage_timer("db_fetch"):
+        total_priv, hired_priv = await approval_counts(session, privileged)
+        total_unpriv, hired_unpriv = await approval_counts(session, unprivileged)
+    rate_priv = hired_priv / total_priv if total_priv else 0
+    rate_unpriv = hired_unpriv / total_unpriv if total_unpriv else 0
+    ratio = rate_unpriv / rate_priv if rate_priv else 0
+    return DisparateImpactResponse(ratio=ratio)
+
+@router.post("/explain", response_model=ExplainResponse)
+async def explain_endpoint(
+    req: ExplainRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session)
+):
+    explanations = request.app.state.explanations
+    if explanations is None:
+        raise HTTPException(status_code=503, detail="Explanation service unavailable")
+    explanations.refresh(AsyncSessionLocal)
+
+    with stage_timer("db_fetch"):
+        result = await session.execute(
+            text(SQL_SELECT_FEATURES_BY_ID), {"id": req.application_id}
+        )
+        row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    raw = row[0]
+    try:
+        with stage_timer("json_decode"):
+            features = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        raise HTTPException(status_code=500, detail="Invalid features JSON")
+
+    try:
+        with stage_timer("vectorize"):
+            X = FEATURE_SCHEMA.to_vector(features)
+    except FeatureValidationError:
+        raise HTTPException(status_code=500, detail="Invalid stored features")
+    mode = explanations.select(1, req.mode, req.latency_budget_ms)
+    with stage_timer("shap_values"):
+        values = await run_in_threadpool(explanations.shap_values, X, mode)
+    contributions = FEATURE_SCHEMA.contributions(values[0])
+    # Update the running summaries after the response has been sent
+    background_tasks.add_task(
+        safe_record_explanations, AsyncSessionLocal,
+        [(req.application_id, features, values[0])], explanations.model_version, mode
+    )
+    return ExplainResponse(
+        contributions=contributions,
+        mode=mode,
+        error_bound=explanations.error_bound(mode)
+    )
+
+@router.post("/explain/calibrate", response_model=CalibrationResponse)
+async def calibrate_explanations_endpoint(request: Request):
+    explanations = request.app.state.explanations
+    if explanations is None:
+        raise HTTPException(status_code=503, detail="Explanation service unavailable")
+    calibrated = await explanations.calibrate(AsyncSessionLocal)
+    return CalibrationResponse(calibrated=calibrated, modes=explanations.calibration)
+
+@router.get("/explain/summary", response_model=FeatureImportanceResponse)
+async def feature_importance_endpoint(
+    request: Request,
+    groups: Optional[List[str]] = Query(None),
+    mode: ExplainMode = EXPLAIN_DEFAULT_MODE,
+    session: AsyncSession = Depends(get_session)
+):
+    explanations = request.app.state.explanations
+    if explanations is None:
+        raise HTTPException(status_code=503, detail="Explanation service unavailable")
+    with stage_timer("db_fetch"):
+        summary = await load_summary(session, explanations.model_version, mode, groups)
+    return FeatureImportanceResponse(**summary)
+
+@router.post("/counterfactual", response_model=CounterfactualResponse, response_model_by_alias=True)
+async def counterfactual_endpoint(
+    req: CounterfactualRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_session)
+):
+    counterfactuals = request.app.state.counterfactuals
+    if counterfactuals is None:
+        raise HTTPException(status_code=503, detail="Counterfactual service unavailable")
+
+    with stage_timer("db_fetch"):
+        row = (await session.execute(
+            text(SQL_SELECT_FEATURES_BY_ID), {"id": req.application_id}
+        )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    raw = row[0]
+    try:
+        with stage_timer("json_decode"):
+            features = json.loads(raw) if isinstance(raw, str) else raw
+        with stage_timer("vectorize"):
+            X = FEATURE_SCHEMA.to_vector(features)
+    except (ValueError, FeatureValidationError):
+        raise HTTPException(status_code=500, detail="Invalid stored features")
+
+    budget = min(req.time_budget_ms or COUNTERFACTUAL_TIME_BUDGET_MS, COUNTERFACTUAL_MAX_TIME_BUDGET_MS)
+    try:
+        with stage_timer("counterfactual_search"):
+            result = await run_in_threadpool(
+                counterfactuals.search, X[0], budget, req.desired_class, req.max_results, req.seed
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CounterfactualResponse(**result)
+
+@router.post("/agent", response_model=AgentResponse)
+async def agent_endpoint(
+    req: AgentRequest
+):
+    response = await call_tool("agent_dispatch", {"messages": [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user",   "content": req.prompt}
+    ]})
+    return AgentResponse(**response)
+
+def _job_response(job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        progress=job.progress,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+        result=job.result,
+        error=job.error
+    )
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job_endpoint(
+    req: JobRequest,
+    request: Request
+):
+    try:
+        job = await request.app.state.jobs.submit(req.kind, req.params, req.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job_endpoint(
+    job_id: str,
+    request: Request
+):
+    job = await request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+@router.post("/prompt-runs", response_model=PromptRunsResponse)
+async def ingest_prompt_runs_endpoint(
+    req: PromptRunsRequest,
+    session: AsyncSession = Depends(get_session)
+):
+    if len(req.runs) > PROMPT_RUNS_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {PROMPT_RUNS_MAX_BATCH} runs per request")
+    with stage_timer("db_write"):
+        inserted = await record_runs(session, req.runs)
+    return PromptRunsResponse(inserted=inserted, skipped=len(req.runs) - inserted)
+
+@router.get("/prompt-metrics", response_model=List[PromptMetrics])
+async def prompt_metrics_endpoint(
+    since: Optional[datetime] = Query(None, description="Window start (default: PROMPT_METRICS_WINDOW_HOURS ago)"),
+    until: Optional[datetime] = Query(None, description="Window end (default: now)"),
+    prompt_id: Optional[str] = None,
+    needs_optimization: Optional[bool] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    with stage_timer("db_fetch"):
+        return await load_metrics(
+            session, since=since, until=until, prompt_id=prompt_id, needs_optimization=needs_optimization
+        )
+
+@router.get("/prompt-metrics/regressions", response_model=List[PromptRegressionAlert])
+async def prompt_regressions_endpoint(session: AsyncSession = Depends(get_session)):
+    with stage_timer("db_fetch"):
+        return await load_regressions(session)
+
+@router.get("/admin/profiles")
+async def list_profiles_endpoint():
+    return {"profiles": await run_in_threadpool(list_profiles)}
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile_endpoint(profile_id: str):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/plain" if path.suffix == ".collapsed" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
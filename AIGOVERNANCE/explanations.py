@@ -0,0 +1,206 @@
+import time
+import asyncio
+import logging
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    EXPLAIN_DEFAULT_MODE,
+    EXPLAIN_TREE_LIMIT,
+    EXPLAIN_BACKGROUND_SIZE,
+    EXPLAIN_VALIDATION_SIZE,
+    EXPLAIN_CALIBRATION_TTL_SECONDS,
+    EXPLAIN_SAMPLE_WINDOW,
+    SQL_SAMPLE_FEATURES,
+)
+from features import FEATURE_SCHEMA
+from metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+EXACT = "exact"
+APPROXIMATE = "approximate"
+TREE_LIMIT = "tree_limit"
+INTERVENTIONAL = "interventional"
+MODES = (EXACT, APPROXIMATE, TREE_LIMIT, INTERVENTIONAL)
+
+# Retry sooner than the TTL when there was nothing to calibrate on
+CALIBRATION_RETRY_SECONDS = 60.0
+
+def shap_matrix(shap_values):
+    """Normalise explainer output to an (n_rows, n_features) array."""
+    import numpy as np
+
+    if isinstance(shap_values, list):
+        shap_values = shap_values[-1]
+    values = np.asarray(shap_values)
+    if values.ndim == 3:
+        values = values[..., -1]
+    return values
+
+def _tree_count(model):
+    """Boosting rounds (or trees, for forests) in `model`, or None if unknown."""
+    estimators = getattr(model, "estimators_", None)
+    if estimators is not None:
+        return len(estimators)
+    if hasattr(model, "tree_"):
+        return 1
+    # XGBoost: shap's tree_limit counts boosting rounds
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    if hasattr(booster, "num_boosted_rounds"):
+        return booster.num_boosted_rounds()
+    # LightGBM: likewise iterations, not num_trees() (one tree per class per round)
+    booster = getattr(model, "booster_", model)
+    if hasattr(booster, "current_iteration"):
+        return booster.current_iteration()
+    return None
+
+class ExplanationService:
+    """
+    Runs SHAP in one of MODES. calibrate() measures each mode's cost per row
+    and its error against exact mode on a sample of stored applications;
+    select() uses those measurements to pick the most accurate mode that
+    fits a latency budget, and callers report them as the error bound.
+    """
+    def __init__(
+        self,
+        model,
+        explainer,
+        model_version: str = "",
+        tree_limit: int = EXPLAIN_TREE_LIMIT,
+        background_size: int = EXPLAIN_BACKGROUND_SIZE,
+        validation_size: int = EXPLAIN_VALIDATION_SIZE,
+    ):
+        self.model = model
+        self.explainer = explainer
+        # Summaries are kept apart per model artifact (see serving.model_version)
+        self.model_version = model_version
+        count = _tree_count(model)
+        # None disables tree_limit mode rather than guessing a single tree
+        self.tree_limit = tree_limit or (max(1, count // 4) if count else None)
+        self.background_size = background_size
+        self.validation_size = validation_size
+        self.background = None
+        self.calibration = {}
+        self._interventional = None
+        self._next_calibration = 0.0
+        self._calibrating = None
+
+    def available(self, mode: str) -> bool:
+        if mode == TREE_LIMIT:
+            return self.tree_limit is not None
+        return mode != INTERVENTIONAL or self._interventional is not None
+
+    def select(self, n_rows: int, mode=None, latency_budget_ms=None) -> str:
+        """
+        An explicit `mode` wins (interventional falls back to exact until a
+        background sample is cached, tree_limit when the model's tree count
+        is unknown). Otherwise pick the lowest-error
+        calibrated mode whose expected time fits the budget, or the fastest
+        one if none does. Raises ValueError for a mode not in MODES.
+        """
+        if mode is None and latency_budget_ms is None:
+            mode = EXPLAIN_DEFAULT_MODE
+        if mode is not None:
+            if mode not in MODES:
+                raise ValueError(f"Unknown explanation mode {mode!r}; expected one of {', '.join(MODES)}")
+            if mode == INTERVENTIONAL:
+                record_cache("explain_background", self._interventional is not None)
+            return mode if self.available(mode) else EXACT
+
+        candidates = [m for m in MODES if m in self.calibration and self.available(m)]
+        if not candidates:
+            return EXACT
+        for m in sorted(candidates, key=lambda m: (self.calibration[m]["max_abs_error"], self.calibration[m]["ms_per_row"])):
+            if self.calibration[m]["ms_per_row"] * n_rows <= latency_budget_ms:
+                return m
+        return min(candidates, key=lambda m: self.calibration[m]["ms_per_row"])
+
+    def shap_values(self, X, mode: str = EXACT):
+        """Blocking; run in a threadpool. Returns an (n_rows, n_features) array."""
+        if mode == APPROXIMATE:
+            values = self.explainer.shap_values(X, approximate=True, check_additivity=False)
+        elif mode == TREE_LIMIT:
+            values = self.explainer.shap_values(X, tree_limit=self.tree_limit, check_additivity=False)
+        elif mode == INTERVENTIONAL:
+            values = self._interventional.shap_values(X, check_additivity=False)
+        else:
+            values = self.explainer.shap_values(X)
+        return shap_matrix(values)
+
+    def error_bound(self, mode: str):
+        """Calibration stats for `mode`, or None before the first calibration."""
+        return self.calibration.get(mode)
+
+    # ─── Calibration ───
+    async def calibrate(self, session_factory) -> bool:
+        async with session_factory() as session:
+            rows = (await session.execute(
+                text(SQL_SAMPLE_FEATURES),
+                {"limit": self.background_size + self.validation_size, "window": EXPLAIN_SAMPLE_WINDOW}
+            )).scalars().all()
+        if not rows:
+            return False
+        X = FEATURE_SCHEMA.to_matrix(rows)
+        await run_in_threadpool(self._calibrate, X)
+        return True
+
+    def _calibrate(self, X):
+        import numpy as np
+        import shap
+
+        # With fewer rows than background_size the two sets overlap
+        background = X[:self.background_size]
+        validation = (X[self.background_size:] if len(X) > self.background_size else X)[:self.validation_size]
+        self._interventional = shap.TreeExplainer(
+            self.model, data=background, feature_perturbation="interventional"
+        )
+        self.background = background
+
+        results = {}
+        for mode in filter(self.available, MODES):
+            start = time.perf_counter()
+            values = self.shap_values(validation, mode)
+            elapsed_ms = 1000 * (time.perf_counter() - start)
+            results[mode] = (values, elapsed_ms)
+
+        exact = results[EXACT][0]
+        exact_total = float(np.abs(exact).sum())
+        calibration = {}
+        for mode, (values, elapsed_ms) in results.items():
+            error = np.abs(values - exact)
+            calibration[mode] = {
+                "max_abs_error": float(error.max()),
+                "mean_abs_error": float(error.mean()),
+                "relative_error": float(error.sum() / exact_total) if exact_total else 0.0,
+                "ms_per_row": elapsed_ms / len(validation),
+                "validation_rows": int(len(validation)),
+            }
+        self.calibration = calibration
+        logger.info("Calibrated explanation modes on %d rows: %s", len(validation), calibration)
+
+    async def _safe_calibrate(self, session_factory):
+        try:
+            ok = await self.calibrate(session_factory)
+        except Exception:
+            logger.error("Explanation mode calibration failed", exc_info=True)
+            ok = False
+        delay = EXPLAIN_CALIBRATION_TTL_SECONDS if ok else CALIBRATION_RETRY_SECONDS
+        self._next_calibration = time.monotonic() + delay
+
+    def refresh(self, session_factory):
+        """Start a background calibration when none has run or the last one is stale."""
+        if self._calibrating is not None and not self._calibrating.done():
+            return
+        if time.monotonic() < self._next_calibration:
+            return
+        self._calibrating = asyncio.create_task(self._safe_calibrate(session_factory))
+
+    async def stop(self):
+        if self._calibrating is not None and not self._calibrating.done():
+            self._calibrating.cancel()
+            try:
+                await self._calibrating
+            except asyncio.CancelledError:
+                pass
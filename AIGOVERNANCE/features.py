@@ -0,0 +1,108 @@
+import json
+import math
+
+from config import FEATURE_SPEC
+
+UNKNOWN_CATEGORY = -1.0
+
+class FeatureValidationError(ValueError):
+    """Raised with a list of per-field messages when features are malformed."""
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+class FeatureSchema:
+    """
+    Compiled form of FEATURE_SPEC: validates incoming feature dicts and turns
+    batches of feature dicts (or their JSON text) into the model's
+    float32 input matrix, with columns in FEATURE_ORDER.
+    """
+    def __init__(self, spec):
+        self.spec = [dict(field) for field in spec]
+        self.names = [field["name"] for field in self.spec]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.codes = {}
+        self.defaults = []
+        for field in self.spec:
+            if field["type"] == "categorical":
+                codes = {value: float(i) for i, value in enumerate(field["categories"])}
+                self.codes[field["name"]] = codes
+                default = field.get("default")
+                self.defaults.append(codes[default] if default is not None else None)
+            elif field["type"] == "numeric":
+                default = field.get("default")
+                self.defaults.append(float(default) if default is not None else None)
+            else:
+                raise ValueError(f"Unknown feature type {field['type']!r} for {field['name']}")
+
+    def __len__(self):
+        return len(self.names)
+
+    def validate(self, features: dict):
+        """Raise FeatureValidationError unless every model feature is well-formed."""
+        if not isinstance(features, dict):
+            raise FeatureValidationError(["features: must be an object"])
+        errors = []
+        for field, default in zip(self.spec, self.defaults):
+            name = field["name"]
+            value = features.get(name)
+            if value is None:
+                if default is None:
+                    errors.append(f"{name}: required")
+                continue
+            if field["type"] == "numeric":
+                number = None
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    try:
+                        number = float(value)
+                    except OverflowError:
+                        pass
+                if number is None or not math.isfinite(number):
+                    errors.append(f"{name}: expected a finite number, got {value!r}")
+                elif "min" in field and number < field["min"]:
+                    errors.append(f"{name}: must be >= {field['min']}")
+                elif "max" in field and number > field["max"]:
+                    errors.append(f"{name}: must be <= {field['max']}")
+            elif not isinstance(value, str):
+                errors.append(f"{name}: expected a string, got {value!r}")
+            elif value not in self.codes[name] and not field.get("allow_unknown", False):
+                errors.append(f"{name}: expected one of {field['categories']}, got {value!r}")
+        if errors:
+            raise FeatureValidationError(errors)
+
+    def to_matrix(self, rows):
+        """
+        Encode a batch of feature dicts or JSON strings into a C-contiguous
+        (n_rows, n_features) float32 array in one pass per column.
+        """
+        import numpy as np
+
+        rows = [json.loads(row) if isinstance(row, (str, bytes)) else row for row in rows]
+        X = np.empty((len(rows), len(self.names)), dtype=np.float32)
+        for j, (field, default) in enumerate(zip(self.spec, self.defaults)):
+            name = field["name"]
+            fill = 0.0 if default is None else default
+            if field["type"] == "numeric":
+                try:
+                    X[:, j] = np.fromiter(
+                        (fill if (v := row.get(name)) is None else v for row in rows),
+                        dtype=np.float32, count=len(rows)
+                    )
+                except (TypeError, ValueError):
+                    raise FeatureValidationError([f"{name}: non-numeric value in batch"])
+            else:
+                codes = self.codes[name]
+                X[:, j] = np.fromiter(
+                    (fill if (v := row.get(name)) is None else codes.get(v, UNKNOWN_CATEGORY) for row in rows),
+                    dtype=np.float32, count=len(rows)
+                )
+        return X
+
+    def to_vector(self, features):
+        return self.to_matrix([features])
+
+    def contributions(self, values) -> dict:
+        """Map one row of per-feature attributions back to feature names."""
+        return {name: float(val) for name, val in zip(self.names, values)}
+
+FEATURE_SCHEMA = FeatureSchema(FEATURE_SPEC)
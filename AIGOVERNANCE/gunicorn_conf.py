@@ -0,0 +1,34 @@
+# gunicorn_conf.py
+#
+# Multi-process serving (Linux/macOS):
+#   gunicorn -c gunicorn_conf.py main:app
+#
+# The master imports the app, creates the schema and loads the model once,
+# then forks WEB_CONCURRENCY uvicorn workers that share those pages
+# copy-on-write. See DEPLOYMENT.md for measured memory/RPS figures.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Workers that stop heart-beating for `timeout` seconds are killed and replaced
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+# On SIGTERM/SIGHUP, workers stop accepting and get this long to drain in-flight requests
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+# Optional periodic recycling to cap slow leaks; 0 disables it
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+def on_starting(server):
+    # Runs in the master before any worker is forked
+    import serving
+    serving.preload()
+
+def post_fork(server, worker):
+    server.log.info("Worker %s forked from preloaded master", worker.pid)
+
+def worker_abort(worker):
+    worker.log.warning("Worker %s timed out and was aborted", worker.pid)
@@ -0,0 +1,95 @@
+import logging
+
+from sqlalchemy import text
+
+from config import SQL_CLAIM_EXPLAINED, SQL_UPSERT_SHAP_SUMMARY, SQL_SELECT_SHAP_SUMMARY
+from features import FEATURE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Group recorded for applications whose features carry no "group"
+UNGROUPED = "unknown"
+
+def _group_of(features) -> str:
+    group = features.get("group") if isinstance(features, dict) else None
+    return UNGROUPED if group is None else str(group)
+
+async def record_explanations(session, explained, model_version: str, mode: str):
+    """
+    Fold freshly computed explanations into the running per-group sums for
+    the model version and explanation mode that produced them.
+    `explained` is an iterable of (application_id, features, shap_row). Each
+    application is counted once per version and mode, however often it is
+    re-explained, and the claim and the sums commit together.
+    """
+    totals = {}
+    claim = text(SQL_CLAIM_EXPLAINED)
+    key = {"model_version": model_version, "mode": mode}
+    for application_id, features, values in explained:
+        result = await session.execute(claim, {**key, "application_id": application_id})
+        if not result.rowcount:
+            continue
+        group = totals.setdefault(_group_of(features), [0, [0.0] * len(FEATURE_SCHEMA), [0.0] * len(FEATURE_SCHEMA)])
+        group[0] += 1
+        for j, value in enumerate(values):
+            value = float(value)
+            group[1][j] += abs(value)
+            group[2][j] += value
+    if not totals:
+        await session.rollback()
+        return 0
+
+    await session.execute(text(SQL_UPSERT_SHAP_SUMMARY), [
+        {**key, "grp": grp, "feature": name, "n": n, "sum_abs": sum_abs[j], "sum_signed": sum_signed[j]}
+        for grp, (n, sum_abs, sum_signed) in totals.items()
+        for j, name in enumerate(FEATURE_SCHEMA.names)
+    ])
+    await session.commit()
+    return sum(n for n, _, _ in totals.values())
+
+async def safe_record_explanations(session_factory, explained, model_version: str, mode: str):
+    """record_explanations in its own session; a failure never fails the explanation."""
+    try:
+        async with session_factory() as session:
+            return await record_explanations(session, explained, model_version, mode)
+    except Exception:
+        logger.error("Failed to update SHAP summaries", exc_info=True)
+        return 0
+
+def _summarize(n: int, sum_abs: dict, sum_signed: dict) -> dict:
+    ranked = sorted(sum_abs, key=sum_abs.get, reverse=True)
+    return {
+        "count": n,
+        "mean_abs": {name: sum_abs[name] / n if n else 0.0 for name in ranked},
+        "mean": {name: sum_signed[name] / n if n else 0.0 for name in ranked},
+    }
+
+async def load_summary(session, model_version: str, mode: str, groups=None) -> dict:
+    """
+    Global and per-group mean |SHAP| (and signed mean) per feature for one
+    model version and explanation mode, features ordered by importance.
+    Reads one row per (group, feature), never the applications themselves.
+    """
+    rows = (await session.execute(
+        text(SQL_SELECT_SHAP_SUMMARY), {"model_version": model_version, "mode": mode}
+    )).all()
+    per_group = {}
+    for grp, feature, n, sum_abs, sum_signed in rows:
+        entry = per_group.setdefault(grp, {"n": n, "abs": {}, "signed": {}})
+        entry["abs"][feature] = sum_abs
+        entry["signed"][feature] = sum_signed
+
+    overall_n = sum(entry["n"] for entry in per_group.values())
+    overall_abs, overall_signed = {}, {}
+    for entry in per_group.values():
+        for feature, value in entry["abs"].items():
+            overall_abs[feature] = overall_abs.get(feature, 0.0) + value
+            overall_signed[feature] = overall_signed.get(feature, 0.0) + entry["signed"][feature]
+
+    wanted = per_group if not groups else {g: per_group.get(g, {"n": 0, "abs": {}, "signed": {}}) for g in groups}
+    return {
+        "model_version": model_version,
+        "mode": mode,
+        "overall": _summarize(overall_n, overall_abs, overall_signed),
+        "groups": {grp: _summarize(e["n"], e["abs"], e["signed"]) for grp, e in wanted.items()},
+    }
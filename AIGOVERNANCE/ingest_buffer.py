@@ -0,0 +1,134 @@
+import json
+import time
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import text, bindparam, DateTime
+
+from config import (
+    INGEST_BATCH_SIZE,
+    INGEST_FLUSH_INTERVAL_MS,
+    INGEST_MAX_PENDING,
+    SQL_INSERT_APPLICATION_IGNORE,
+)
+from database import AsyncSessionLocal
+from metrics import stage_timer, INGEST_BATCH_ROWS
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 0.001
+
+class IngestBuffer:
+    """
+    Write-behind ingest with group commit. submit() queues an application
+    and waits; a single writer task takes up to `batch_size` queued rows (or
+    whatever arrived within `flush_interval_ms` of the first one) and inserts
+    them in one transaction. Each caller's future resolves only after that
+    transaction commits, so an acknowledgement is as durable as before.
+    """
+    def __init__(
+        self,
+        batch_size: int = INGEST_BATCH_SIZE,
+        flush_interval_ms: float = INGEST_FLUSH_INTERVAL_MS,
+        max_pending: int = INGEST_MAX_PENDING,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._insert = text(SQL_INSERT_APPLICATION_IGNORE).bindparams(bindparam("created_at", type_=DateTime))
+        self._queue = None
+        self._task = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        """Commit everything already queued, then stop the writer."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, application_id: str, features: dict):
+        """
+        Return once the application's batch has committed. An application_id
+        that already exists is skipped, as with IntegrityError today. A full
+        buffer makes callers wait here, which applies backpressure. Raises
+        ValueError for a missing or non-string application_id.
+        """
+        if not isinstance(application_id, str) or not application_id:
+            raise ValueError("application_id must be a non-empty string")
+        future = asyncio.get_running_loop().create_future()
+        row = {
+            "application_id": application_id,
+            "features": json.dumps(features),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None),
+        }
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Poll rather than wait_for(get()): a timed-out get can drop an item
+            await asyncio.sleep(min(remaining, POLL_INTERVAL_SECONDS))
+        return batch
+
+    async def _commit(self, rows):
+        async with self.session_factory() as session:
+            with stage_timer("ingest_commit"):
+                await session.execute(self._insert, rows)
+                await session.commit()
+
+    async def _commit_each(self, batch):
+        """Retry a failed batch row by row, so only the bad rows' callers see an error."""
+        for row, future in batch:
+            try:
+                await self._commit([row])
+            except Exception as e:
+                logger.error("Write-behind ingest of %s failed", row["application_id"], exc_info=True)
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                INGEST_BATCH_ROWS.observe(1)
+                if not future.done():
+                    future.set_result(None)
+
+    async def _writer(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._commit([row for row, _ in batch])
+            except Exception:
+                logger.warning("Write-behind ingest batch of %d failed; retrying rows one by one", len(batch))
+                await self._commit_each(batch)
+            else:
+                INGEST_BATCH_ROWS.observe(len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,486 @@
+import json
+import uuid
+import asyncio
+import datetime
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text, bindparam, select, update, delete, DateTime
+
+from config import (
+    JOB_WORKERS,
+    JOB_CPU_THREADS,
+    JOB_MAX_QUEUED,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_SWEEP_INTERVAL_SECONDS,
+    JOB_EXPLAIN_CHUNK_SIZE,
+    JOB_EXPLAIN_MAX_CHUNK_SIZE,
+    RETENTION_ENABLED,
+    RETENTION_HOT_MONTHS,
+    SQL_COUNT_ALL_APPLICATIONS,
+    SQL_SELECT_FEATURES_PAGE,
+    SQL_SELECT_FEATURES_BY_IDS,
+    SQL_AUDIT_GROUPS,
+    SQL_AUDIT_GROUP_COUNTS,
+    SQL_AUDIT_INTERSECTION,
+    SQL_AUDIT_FILTERS,
+)
+from database import AsyncSessionLocal
+from models import Job
+from metrics import stage_timer
+from features import FEATURE_SCHEMA
+from importance import safe_record_explanations
+from explanations import MODES
+from retention import run_maintenance
+import tools
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# ─── Job Handler Registry ───
+JOB_HANDLERS = {}
+JOB_VALIDATORS = {}
+
+def job_handler(kind: str, validate=None):
+    """
+    Register an async handler for jobs of the given kind. `validate`, if
+    given, is called with the params at submit time and raises ValueError
+    to reject the job.
+    """
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        if validate is not None:
+            JOB_VALIDATORS[kind] = validate
+        return fn
+    return register
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+class QueueFullError(Exception):
+    pass
+
+async def recover_interrupted_jobs():
+    """Re-queue jobs left running by a process that exited mid-job."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Job).where(Job.status == RUNNING)
+            .values(status=QUEUED, progress=0.0, started_at=None)
+        )
+        await session.commit()
+    if result.rowcount:
+        logger.info("Re-queued %d interrupted jobs", result.rowcount)
+
+class JobContext:
+    """
+    Passed to job handlers: exposes the job parameters, progress reporting
+    and the queue's dedicated CPU executor.
+    """
+    def __init__(self, queue, job_id: str, params: dict):
+        self.queue = queue
+        self.job_id = job_id
+        self.params = params or {}
+
+    async def report_progress(self, fraction: float):
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(Job).where(Job.id == self.job_id)
+                .values(progress=max(0.0, min(1.0, fraction)))
+            )
+            await session.commit()
+
+    async def run_cpu(self, fn, *args):
+        # Keep CPU-bound work off the default threadpool used by request handlers
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.queue.executor, fn, *args)
+
+# ─── Job Queue ───
+class JobQueue:
+    """
+    Bounded in-process worker pool backed by the persistent `jobs` table.
+    Higher `priority` values run first; ties run in submission order.
+    """
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        cpu_threads: int = JOB_CPU_THREADS,
+        max_queued: int = JOB_MAX_QUEUED,
+        result_ttl: int = JOB_RESULT_TTL_SECONDS,
+        sweep_interval: float = JOB_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.sweep_interval = sweep_interval
+        self.busy = 0
+        self.executor = None
+        self._queue = None
+        self._tasks = []
+        self._seq = itertools.count()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self, recover: bool = True):
+        """
+        Start the workers and pick up queued jobs. With `recover`, jobs left
+        running by a previous process are re-queued first; multi-worker
+        deployments do that once in the master instead (see serving.preload).
+        """
+        self._queue = asyncio.PriorityQueue()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.cpu_threads, thread_name_prefix="job-cpu"
+        )
+        if recover:
+            await recover_interrupted_jobs()
+        async with AsyncSessionLocal() as session:
+            pending = (await session.execute(
+                select(Job.id, Job.priority)
+                .where(Job.status == QUEUED)
+                .order_by(Job.created_at)
+            )).all()
+        for job_id, priority in pending:
+            self._enqueue(job_id, priority)
+        if pending:
+            logger.info("Re-queued %d pending jobs", len(pending))
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def submit(self, kind: str, params: dict, priority: int = 0) -> Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if kind in JOB_VALIDATORS:
+            JOB_VALIDATORS[kind](params or {})
+        if self.depth >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} pending)")
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            status=QUEUED,
+            priority=priority,
+            progress=0.0,
+            params=params or {},
+            created_at=_utcnow(),
+        )
+        async with AsyncSessionLocal() as session:
+            session.add(job)
+            await session.commit()
+        self._enqueue(job.id, priority)
+        logger.debug("Submitted job %s (%s, priority=%d)", job.id, kind, priority)
+        return job
+
+    async def get(self, job_id: str):
+        async with AsyncSessionLocal() as session:
+            job = await session.get(Job, job_id)
+        if job is None or (job.expires_at is not None and job.expires_at <= _utcnow()):
+            return None
+        return job
+
+    def _enqueue(self, job_id: str, priority: int):
+        self._queue.put_nowait((-priority, next(self._seq), job_id))
+
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.error("Job worker error for %s", job_id, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        # Claim atomically: other worker processes may have queued the same job
+        async with AsyncSessionLocal() as session:
+            claimed = await session.execute(
+                update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                .values(status=RUNNING, started_at=_utcnow())
+            )
+            await session.commit()
+            if claimed.rowcount != 1:
+                return
+            job = await session.get(Job, job_id)
+            kind, params = job.kind, job.params
+
+        self.busy += 1
+        try:
+            result = await JOB_HANDLERS[kind](JobContext(self, job_id, params))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error("Job %s (%s) failed", job_id, kind, exc_info=True)
+            await self._finish(job_id, FAILED, error=str(exc))
+        else:
+            await self._finish(job_id, SUCCEEDED, result=result)
+        finally:
+            self.busy -= 1
+
+    async def _finish(self, job_id: str, status: str, result=None, error=None):
+        now = _utcnow()
+        values = dict(
+            status=status,
+            result=result,
+            error=error,
+            finished_at=now,
+            expires_at=now + datetime.timedelta(seconds=self.result_ttl),
+        )
+        if status == SUCCEEDED:
+            values["progress"] = 1.0
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(Job).where(Job.id == job_id).values(**values))
+            await session.commit()
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.purge_expired()
+            except Exception:
+                logger.error("Job result sweep failed", exc_info=True)
+
+    async def purge_expired(self) -> int:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(delete(Job).where(Job.expires_at <= _utcnow()))
+            await session.commit()
+        if result.rowcount:
+            logger.info("Purged %d expired job results", result.rowcount)
+        return result.rowcount
+
+# ─── Job Handlers ───
+def _parse_window_bound(params: dict, name: str):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        value = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an ISO 8601 datetime, got {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+def _validate_fairness_audit(params: dict):
+    since = _parse_window_bound(params, "since")
+    until = _parse_window_bound(params, "until")
+    if since is not None and until is not None and since >= until:
+        raise ValueError("since must be before until")
+    categorical = {f["name"] for f in FEATURE_SCHEMA.spec if f["type"] == "categorical"}
+    unknown = [name for name in params.get("intersect") or [] if name not in categorical]
+    if unknown:
+        raise ValueError(
+            f"Cannot intersect on {', '.join(map(repr, unknown))}; "
+            f"expected categorical features: {', '.join(sorted(categorical))}"
+        )
+
+def _audit_filters(since, until):
+    """WHERE clauses and params for one group's hot rows and summary months."""
+    hot = [SQL_AUDIT_FILTERS["group"]]
+    summary = [SQL_AUDIT_FILTERS["summary_group"]]
+    params = {}
+    if since is not None:
+        hot.append(SQL_AUDIT_FILTERS["since"])
+        summary.append(SQL_AUDIT_FILTERS["summary_since"])
+        params["since"] = since
+        # A month counts only if it starts inside the window
+        first = datetime.datetime(since.year, since.month, 1)
+        if first < since:
+            first = (first + datetime.timedelta(days=31)).replace(day=1)
+        params["since_month"] = first.strftime("%Y-%m")
+    if until is not None:
+        hot.append(SQL_AUDIT_FILTERS["until"])
+        summary.append(SQL_AUDIT_FILTERS["summary_until"])
+        params["until"] = until
+        params["until_month"] = until.strftime("%Y-%m")
+    return " AND ".join(hot), " AND ".join(summary), params
+
+def _rate(total, approved) -> dict:
+    return {"total": total, "approved": approved, "approval_rate": approved / total if total else 0}
+
+@job_handler("fairness_audit", validate=_validate_fairness_audit)
+async def fairness_audit(ctx: JobContext):
+    """
+    Approval rate for every group (or the given `groups`), and the disparate
+    impact ratio of each group against the privileged one (default: the
+    highest approval rate). `since`/`until` limit the audit to applications
+    created in [since, until); rolled-up months are included when they lie
+    wholly inside the window. `intersect` lists categorical features to break
+    each group down by; those breakdowns cover the hot table only, since
+    summaries keep no features. Progress is reported after each group.
+    """
+    since = _parse_window_bound(ctx.params, "since")
+    until = _parse_window_bound(ctx.params, "until")
+    intersect = ctx.params.get("intersect") or []
+    hot_where, summary_where, window = _audit_filters(since, until)
+    bounds = (bindparam("since", type_=DateTime), bindparam("until", type_=DateTime))
+    counts_query = text(SQL_AUDIT_GROUP_COUNTS.format(hot_where=hot_where, summary_where=summary_where))
+    counts_query = counts_query.bindparams(*(b for b in bounds if b.key in window))
+    intersection_query = text(SQL_AUDIT_INTERSECTION.format(hot_where=hot_where))
+    intersection_query = intersection_query.bindparams(*(b for b in bounds if b.key in window))
+
+    names = ctx.params.get("groups")
+    if not names:
+        async with AsyncSessionLocal() as session:
+            names = (await session.execute(text(SQL_AUDIT_GROUPS))).scalars().all()
+
+    groups = {}
+    intersections = {}
+    for i, grp in enumerate(names):
+        async with AsyncSessionLocal() as session:
+            total, approved = (await session.execute(counts_query, {**window, "grp": grp})).one()
+            if total:
+                groups[grp] = _rate(total, approved)
+            for feature in intersect:
+                rows = (await session.execute(
+                    intersection_query, {**window, "grp": grp, "path": f"$.{feature}"}
+                )).all()
+                breakdown = {str(value): _rate(n, ok or 0) for value, n, ok in rows}
+                if breakdown:
+                    intersections.setdefault(grp, {})[feature] = breakdown
+        await ctx.report_progress((i + 1) / len(names))
+
+    privileged = ctx.params.get("privileged")
+    if privileged is None and groups:
+        privileged = max(groups, key=lambda g: groups[g]["approval_rate"])
+    rate_priv = groups.get(privileged, {}).get("approval_rate", 0)
+    disparate_impact = {
+        grp: (stats["approval_rate"] / rate_priv if rate_priv else 0)
+        for grp, stats in groups.items()
+    }
+    result = {
+        "privileged": privileged,
+        "groups": groups,
+        "disparate_impact": disparate_impact,
+        "window": {
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+        },
+    }
+    if intersect:
+        result["intersections"] = intersections
+    return result
+
+async def _explain_rows(ctx: JobContext, explanations, mode: str, rows):
+    """SHAP values for one chunk of (id, application_id, features) rows, folded into the summaries."""
+    if not rows:
+        return []
+    with stage_timer("json_decode"):
+        features = [json.loads(raw) if isinstance(raw, (str, bytes)) else raw for _, _, raw in rows]
+    with stage_timer("vectorize"):
+        X = FEATURE_SCHEMA.to_matrix(features)
+    with stage_timer("job_shap_values"):
+        values = await ctx.run_cpu(explanations.shap_values, X, mode)
+    await safe_record_explanations(AsyncSessionLocal, [
+        (application_id, feats, row)
+        for (_, application_id, _), feats, row in zip(rows, features, values)
+    ], explanations.model_version, mode)
+    return values
+
+def _validate_batch_explain(params: dict):
+    mode = params.get("mode")
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Unknown explanation mode {mode!r}; expected one of {', '.join(MODES)}")
+    chunk_size = params.get("chunk_size")
+    if chunk_size is not None and (
+        not isinstance(chunk_size, int) or isinstance(chunk_size, bool)
+        or not 1 <= chunk_size <= JOB_EXPLAIN_MAX_CHUNK_SIZE
+    ):
+        raise ValueError(f"chunk_size must be an integer between 1 and {JOB_EXPLAIN_MAX_CHUNK_SIZE}")
+
+@job_handler("batch_explain", validate=_validate_batch_explain)
+async def batch_explain(ctx: JobContext):
+    """
+    SHAP contributions for the given `application_ids`, or for every stored
+    application when none are given, explained in chunks. `mode` or
+    `latency_budget_ms` (per chunk) choose the explanation mode. Every chunk
+    is folded into the feature importance summaries as it is explained; a
+    whole-table run returns only counts and mean contributions, so its
+    result stays the same size however many applications there are.
+    """
+    explanations = tools.explanations
+    if explanations is None:
+        raise RuntimeError("Explanation service unavailable")
+
+    chunk_size = ctx.params.get("chunk_size") or JOB_EXPLAIN_CHUNK_SIZE
+    mode = explanations.select(chunk_size, ctx.params.get("mode"), ctx.params.get("latency_budget_ms"))
+    application_ids = ctx.params.get("application_ids")
+    result = {"mode": mode, "error_bound": explanations.error_bound(mode)}
+
+    if application_ids:
+        query = text(SQL_SELECT_FEATURES_BY_IDS).bindparams(bindparam("ids", expanding=True))
+        contributions = {}
+        total = len(application_ids)
+        for start in range(0, total, chunk_size):
+            batch = application_ids[start:start + chunk_size]
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(query, {"ids": batch})).all()
+            values = await _explain_rows(ctx, explanations, mode, rows)
+            for (_, application_id, _), row in zip(rows, values):
+                contributions[application_id] = FEATURE_SCHEMA.contributions(row)
+            await ctx.report_progress(min(start + chunk_size, total) / total)
+        return dict(
+            result,
+            explained=len(contributions),
+            missing=sorted(set(application_ids) - contributions.keys()),
+            contributions=contributions,
+        )
+
+    async with AsyncSessionLocal() as session:
+        total = (await session.execute(text(SQL_COUNT_ALL_APPLICATIONS))).scalar() or 0
+    explained = 0
+    sum_abs = [0.0] * len(FEATURE_SCHEMA)
+    sum_signed = [0.0] * len(FEATURE_SCHEMA)
+    after_id = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(
+                text(SQL_SELECT_FEATURES_PAGE),
+                {"after_id": after_id, "limit": chunk_size}
+            )).all()
+        if not rows:
+            break
+        after_id = rows[-1][0]
+        values = await _explain_rows(ctx, explanations, mode, rows)
+        explained += len(rows)
+        for j, (col_abs, col_signed) in enumerate(zip(abs(values).sum(axis=0), values.sum(axis=0))):
+            sum_abs[j] += float(col_abs)
+            sum_signed[j] += float(col_signed)
+        if total:
+            await ctx.report_progress(explained / total)
+
+    return dict(
+        result,
+        explained=explained,
+        mean_abs=FEATURE_SCHEMA.contributions([v / explained if explained else 0.0 for v in sum_abs]),
+        mean=FEATURE_SCHEMA.contributions([v / explained if explained else 0.0 for v in sum_signed]),
+    )
+
+@job_handler("maintenance")
+async def maintenance(ctx: JobContext):
+    """
+    Run database maintenance now: roll expired months into summaries when
+    `retention` is set (default RETENTION_ENABLED; `hot_months` overrides
+    RETENTION_HOT_MONTHS), then compact the database.
+    """
+    return await run_maintenance(
+        retention=bool(ctx.params.get("retention", RETENTION_ENABLED)),
+        hot_months=int(ctx.params.get("hot_months", RETENTION_HOT_MONTHS)),
+    )
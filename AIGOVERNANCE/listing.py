@@ -0,0 +1,183 @@
+import io
+import csv
+import json
+import datetime
+
+from sqlalchemy import text, bindparam, DateTime
+
+from config import SQL_SELECT_APPLICATIONS, SQL_APPLICATION_FILTERS, EXPORT_CHUNK_SIZE
+
+PENDING = "pending"
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_COLUMNS = ["id", "application_id", "decision", "group", "created_at", "features"]
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+def build_query(group=None, decision=None, created_after=None, created_before=None, cursor=None, limit=None):
+    """
+    SELECT over applications with the given filters, ordered by id. A
+    `decision` of "pending" matches applications without a decision yet.
+    """
+    clauses, params = [], {}
+    for name, value in (
+        ("cursor", cursor),
+        ("group", group),
+        ("created_after", _naive_utc(created_after)),
+        ("created_before", _naive_utc(created_before)),
+    ):
+        if value is not None:
+            clauses.append(SQL_APPLICATION_FILTERS[name])
+            params[name] = value
+    if decision == PENDING:
+        clauses.append(SQL_APPLICATION_FILTERS["pending"])
+    elif decision is not None:
+        clauses.append(SQL_APPLICATION_FILTERS["decision"])
+        params["decision"] = decision
+
+    sql = SQL_SELECT_APPLICATIONS
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+
+    query = text(sql)
+    for name in ("created_after", "created_before"):
+        if name in params:
+            query = query.bindparams(bindparam(name, type_=DateTime))
+    return query.columns(created_at=DateTime), params
+
+def _features(raw):
+    return json.loads(raw) if isinstance(raw, str) else raw
+
+def _created(value):
+    return value.isoformat() if value is not None else None
+
+async def list_page(session, limit: int, **filters) -> dict:
+    """One keyset page; pass `next_cursor` back as `cursor` for the next one."""
+    query, params = build_query(limit=limit, **filters)
+    rows = (await session.execute(query, params)).all()
+    items = [
+        {
+            "id": id_,
+            "application_id": application_id,
+            "decision": decision,
+            "group": grp,
+            "created_at": created_at,
+            "features": _features(raw),
+        }
+        for id_, application_id, decision, grp, created_at, raw in rows
+    ]
+    next_cursor = rows[-1][0] if len(rows) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+# ─── Streaming Export ───
+def _ndjson_chunk(rows) -> bytes:
+    # Stored features are already JSON text; splice them in without re-encoding
+    lines = []
+    for id_, application_id, decision, grp, created_at, raw in rows:
+        features = raw if isinstance(raw, str) else json.dumps(raw)
+        lines.append(
+            f'{{"id":{id_},"application_id":{json.dumps(application_id)},'
+            f'"decision":{json.dumps(decision)},"group":{json.dumps(grp)},'
+            f'"created_at":{json.dumps(_created(created_at))},"features":{features}}}\n'
+        )
+    return "".join(lines).encode("utf-8")
+
+def _csv_chunk(rows, header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for id_, application_id, decision, grp, created_at, raw in rows:
+        features = raw if isinstance(raw, str) else json.dumps(raw)
+        writer.writerow([id_, application_id, decision, grp, _created(created_at), features])
+    return buf.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each row group."""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class _ParquetEncoder:
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("application_id", pa.string()),
+            ("decision", pa.string()),
+            ("group", pa.string()),
+            ("created_at", pa.timestamp("us")),
+            ("features", pa.string()),
+        ])
+        self.sink = _ChunkSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    def chunk(self, rows) -> bytes:
+        columns = list(zip(*rows))
+        columns[3] = [None if g is None else str(g) for g in columns[3]]
+        columns[5] = [raw if isinstance(raw, str) else json.dumps(raw) for raw in columns[5]]
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+async def stream_export(session_factory, fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE, **filters):
+    """
+    Yield the export in `fmt` chunk by chunk. Rows come from a server-side
+    cursor (`yield_per`), so memory is bounded by `chunk_size` rows however
+    many applications match.
+    """
+    query, params = build_query(**filters)
+    query = query.execution_options(yield_per=chunk_size)
+    encoder = _ParquetEncoder() if fmt == "parquet" else None
+    first = True
+    async with session_factory() as session:
+        result = await session.stream(query, params)
+        async for rows in result.partitions():
+            if fmt == "ndjson":
+                yield _ndjson_chunk(rows)
+            elif fmt == "csv":
+                yield _csv_chunk(rows, header=first)
+            else:
+                yield encoder.chunk(rows)
+            first = False
+    if fmt == "csv" and first:
+        yield _csv_chunk([], header=True)
+    if encoder is not None:
+        yield encoder.close()
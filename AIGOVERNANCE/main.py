@@ -1,89 +1,210 @@
-import os
-import pickle
-import logging
-from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
-from fastapi.security import APIKeyHeader
-from starlette.concurrency import run_in_threadpool
-
-import shap
-
-from config import MODEL_PATH, FEATURE_ORDER, SYSTEM_PROMPT
-from database import init_db
-from endpoints import router
-import tools
-
-# ─── Logging Configuration ───
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
-)
-logger = logging.getLogger(__name__)
-
-# ─── FastAPI App & Security ───
-app = FastAPI()
-API_KEY = os.getenv("X_API_KEY", "secret-key")
-api_key_header = APIKeyHeader(name="x-api-key")
-
-def get_api_key(x_api_key: str = Depends(api_key_header)):
-    if x_api_key != API_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API Key")
-    return x_api_key
-
-# ─── Global Exception Handler ───
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(
-        f"Unhandled exception on {request.method} {request.url}: {exc}",
-        exc_info=True
-    )
-    return JSONResponse(
-        status_code=500,
-        content={"detail": "Internal Server Error"}
-    )
-
-# ─── Startup Event: Initialize DB & Load Model/Explainer ───
-@app.on_event("startup")
-async def on_startup():
-    # Initialize the database
-    await init_db()
-    logger.debug("Database initialized")
-
-    # Helper to load model with closed file handle
-    def _load_model(path: str):
-        with open(path, "rb") as f:
-            return pickle.load(f)
-
-    # Load model and SHAP explainer off the event loop
-    logger.info("Attempting to load model from %s", os.path.abspath(MODEL_PATH))
-    try:
-        model = await run_in_threadpool(_load_model, MODEL_PATH)
-        explainer = await run_in_threadpool(shap.TreeExplainer, model)
-        app.state.model = model
-        app.state.explainer = explainer
-        app.state.FEATURE_ORDER = FEATURE_ORDER
-        app.state.SYSTEM_PROMPT = SYSTEM_PROMPT
-
-        # Also make explainer available in tools
-        tools.explainer = explainer
-
-        logger.info("Loaded model and SHAP explainer successfully.")
-    except FileNotFoundError:
-        app.state.model = None
-        app.state.explainer = None
-        app.state.FEATURE_ORDER = FEATURE_ORDER
-        app.state.SYSTEM_PROMPT = SYSTEM_PROMPT
-
-        # Ensure tools.explainer is also None
-        tools.explainer = None
-
-        logger.warning(
-            "Model file not found at %s, /explain endpoint will be disabled",
-            os.path.abspath(MODEL_PATH)
-        )
-
-# ─── Include Router with API Key Dependency ───
-app.include_router(
-    router,
-    dependencies=[Depends(get_api_key)]
-)
+import os
+import time
+import logging
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.security import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
+from anyio import to_thread
+
+from config import (
+    MODEL_PATH, FEATURE_ORDER, SYSTEM_PROMPT, LOG_LEVEL, PROFILING_ENABLED, INGEST_WRITE_BEHIND, RETENTION_ENABLED
+)
+from database import init_db, engine, AsyncSessionLocal
+from endpoints import router
+from explanations import ExplanationService
+from counterfactuals import CounterfactualSearch
+from ingest_buffer import IngestBuffer
+from jobs import JobQueue
+from metrics import REGISTRY, REQUEST_LATENCY
+from profiling import ProfilingMiddleware
+from retention import MaintenanceScheduler
+from serving import load_model_and_explainer, model_version
+import serving
+import tools
+
+# ─── Logging Configuration ───
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# ─── FastAPI App & Security ───
+app = FastAPI()
+API_KEY = os.getenv("X_API_KEY", "secret-key")
+api_key_header = APIKeyHeader(name="x-api-key")
+
+def get_api_key(x_api_key: str = Depends(api_key_header)):
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid API Key")
+    return x_api_key
+
+# ─── Global Exception Handler ───
+@app.exception_handler(Exception)
+async def global_exception_handler(request: Request, exc: Exception):
+    logger.error(
+        f"Unhandled exception on {request.method} {request.url}: {exc}",
+        exc_info=True
+    )
+    return JSONResponse(
+        status_code=500,
+        content={"detail": "Internal Server Error"}
+    )
+
+# ─── Request Latency Middleware ───
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            request.method,
+            route.path if route is not None else "unmatched",
+            status
+        )
+
+# ─── Opt-in Request Profiling ───
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, api_key=API_KEY)
+
+# ─── Saturation Gauges ───
+REGISTRY.gauge("db_pool_checked_out", "DB connections currently in use", lambda: engine.pool.checkedout())
+REGISTRY.gauge("db_pool_size", "Configured DB connection pool size", lambda: engine.pool.size())
+REGISTRY.gauge(
+    "threadpool_busy_threads", "Request threadpool threads in use",
+    lambda: to_thread.current_default_thread_limiter().borrowed_tokens
+)
+REGISTRY.gauge(
+    "threadpool_total_threads", "Request threadpool capacity",
+    lambda: to_thread.current_default_thread_limiter().total_tokens
+)
+REGISTRY.gauge("job_queue_depth", "Jobs waiting for a worker", lambda: app.state.jobs.depth)
+REGISTRY.gauge("job_workers_busy", "Job workers currently running a job", lambda: app.state.jobs.busy)
+REGISTRY.gauge("job_workers_total", "Configured job workers", lambda: app.state.jobs.workers)
+REGISTRY.gauge(
+    "ingest_buffer_pending", "Applications waiting for a write-behind commit",
+    lambda: app.state.ingest_buffer.depth if app.state.ingest_buffer is not None else 0
+)
+
+# ─── Worker Health Check ───
+@app.get("/health", include_in_schema=False)
+async def health_endpoint():
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "preloaded": serving.preloaded,
+        "model_loaded": getattr(app.state, "model", None) is not None,
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _start_model_services(model, explainer, version=None):
+    # Explanation modes are calibrated in the background once data is available
+    explanations = ExplanationService(model, explainer, version or "") if explainer is not None else None
+    app.state.explanations = explanations
+    tools.explanations = explanations
+    if explanations is not None:
+        explanations.refresh(AsyncSessionLocal)
+
+    counterfactuals = CounterfactualSearch(model) if hasattr(model, "predict_proba") else None
+    app.state.counterfactuals = counterfactuals
+    tools.counterfactuals = counterfactuals
+
+async def _start_ingest_buffer():
+    buffer = IngestBuffer() if INGEST_WRITE_BEHIND else None
+    if buffer is not None:
+        await buffer.start()
+        logger.info("Write-behind ingest enabled")
+    app.state.ingest_buffer = buffer
+    tools.ingest_buffer = buffer
+
+async def _start_maintenance():
+    app.state.maintenance = MaintenanceScheduler(retention=RETENTION_ENABLED)
+    await app.state.maintenance.start()
+
+# ─── Startup Event: Initialize DB & Load Model/Explainer ───
+@app.on_event("startup")
+async def on_startup():
+    app.state.FEATURE_ORDER = FEATURE_ORDER
+    app.state.SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    # Forked from a preloading master: schema and model are already in place
+    if serving.preloaded:
+        app.state.model = serving.model
+        app.state.explainer = serving.explainer
+        tools.explainer = serving.explainer
+        _start_model_services(serving.model, serving.explainer, serving.version)
+        logger.info("Worker %d using preloaded model and explainer", os.getpid())
+        app.state.jobs = JobQueue()
+        await app.state.jobs.start(recover=False)
+        await _start_ingest_buffer()
+        await _start_maintenance()
+        return
+
+    # Initialize the database
+    await init_db()
+    logger.debug("Database initialized")
+
+    # Load model and SHAP explainer off the event loop
+    logger.info("Attempting to load model from %s", os.path.abspath(MODEL_PATH))
+    try:
+        model, explainer = await run_in_threadpool(load_model_and_explainer, MODEL_PATH)
+        version = await run_in_threadpool(model_version, MODEL_PATH)
+        app.state.model = model
+        app.state.explainer = explainer
+
+        # Also make explainer available in tools
+        tools.explainer = explainer
+        _start_model_services(model, explainer, version)
+
+        logger.info("Loaded model and SHAP explainer successfully.")
+    except FileNotFoundError:
+        app.state.model = None
+        app.state.explainer = None
+
+        # Ensure tools.explainer is also None
+        tools.explainer = None
+        _start_model_services(None, None)
+
+        logger.warning(
+            "Model file not found at %s, /explain endpoint will be disabled",
+            os.path.abspath(MODEL_PATH)
+        )
+
+    # Start the background job workers
+    app.state.jobs = JobQueue()
+    await app.state.jobs.start()
+    await _start_ingest_buffer()
+    await _start_maintenance()
+
+# ─── Shutdown Event: Flush Ingest Buffer & Stop Background Tasks ───
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Startup may have failed part-way, so any of these can be missing
+    buffer = getattr(app.state, "ingest_buffer", None)
+    if buffer is not None:
+        await buffer.stop()
+    jobs = getattr(app.state, "jobs", None)
+    if jobs is not None:
+        await jobs.stop()
+    maintenance = getattr(app.state, "maintenance", None)
+    if maintenance is not None:
+        await maintenance.stop()
+    explanations = getattr(app.state, "explanations", None)
+    if explanations is not None:
+        await explanations.stop()
+
+# ─── Include Router with API Key Dependency ───
+app.include_router(
+    router,
+    dependencies=[Depends(get_api_key)]
+)
@@ -1,15 +1,24 @@
-from sqlalchemy import Column, Integer, String, JSON, Float
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
-
-class Application(Base):
-    __tablename__ = 'applications'
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    application_id = Column(String, unique=True, nullable=False)
-    features = Column(JSON, nullable=False)
-    decision = Column(String, nullable=True)
-
-    def __repr__(self):
-        return f"<Application(application_id={self.application_id}, decision={self.decision})>"
+import datetime
+
+from sqlalchemy import Column, Integer, String, JSON, Float, DateTime, text
+from sqlalchemy.ext.declarative import declarative_base
+
+from config import SQL_UTCNOW_DEFAULT
+
+Base = declarative_base()
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+class Application(Base):
+    __tablename__ = 'applications'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    application_id = Column(String, unique=True, nullable=False)
+    features = Column(JSON, nullable=False)
+    decision = Column(String, nullable=True)
+    # Naive UTC; NULL for rows ingested before the column existed
+    created_at = Column(DateTime, nullable=True, default=_utcnow, server_default=text(SQL_UTCNOW_DEFAULT))
+
+    def __repr__(self):
+        return f"<Application(application_id={self.application_id}, decision={self.decision})>"
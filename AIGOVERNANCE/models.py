@@ -1,15 +1,179 @@
-from sqlalchemy import Column, Integer, String, JSON, Float
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
-
-class Application(Base):
-    __tablename__ = 'applications'
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    application_id = Column(String, unique=True, nullable=False)
-    features = Column(JSON, nullable=False)
-    decision = Column(String, nullable=True)
-
-    def __repr__(self):
-        return f"<Application(application_id={self.application_id}, decision={self.decision})>"
+import datetime
+
+from sqlalchemy import Column, Integer, String, Text, JSON, Float, Boolean, DateTime, Index, text
+from sqlalchemy.ext.declarative import declarative_base
+
+from config import SQL_UTCNOW_DEFAULT
+
+Base = declarative_base()
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+class Application(Base):
+    __tablename__ = 'applications'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    application_id = Column(String, unique=True, nullable=False)
+    features = Column(JSON, nullable=False)
+    decision = Column(String, nullable=True)
+    # Naive UTC; NULL for rows ingested before the column existed
+    created_at = Column(DateTime, nullable=True, default=_utcnow, server_default=text(SQL_UTCNOW_DEFAULT))
+
+    def __repr__(self):
+        return f"<Application(application_id={self.application_id}, decision={self.decision})>"
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        Index('ix_jobs_status_priority', 'status', 'priority', 'created_at'),
+        Index('ix_jobs_expires_at', 'expires_at'),
+    )
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='queued')
+    priority = Column(Integer, nullable=False, default=0)
+    progress = Column(Float, nullable=False, default=0.0)
+    params = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
+
+class ShapSummary(Base):
+    """
+    Running totals of SHAP values per (model version, mode, group, feature);
+    means are sums / n. Versions and modes are never mixed.
+    """
+    __tablename__ = 'shap_summaries'
+
+    model_version = Column(String, primary_key=True)
+    mode = Column(String, primary_key=True)
+    grp = Column(String, primary_key=True)
+    feature = Column(String, primary_key=True)
+    n = Column(Integer, nullable=False, default=0)
+    sum_abs = Column(Float, nullable=False, default=0.0)
+    sum_signed = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<ShapSummary(grp={self.grp}, feature={self.feature}, n={self.n})>"
+
+class ShapExplained(Base):
+    """Applications already folded into shap_summaries, so each counts once per version and mode."""
+    __tablename__ = 'shap_explained'
+
+    model_version = Column(String, primary_key=True)
+    mode = Column(String, primary_key=True)
+    application_id = Column(String, primary_key=True)
+
+class ApplicationSummary(Base):
+    """Approval counts per (month, group) for applications rolled out by retention."""
+    __tablename__ = 'application_summaries'
+    __table_args__ = (
+        Index('ix_application_summaries_grp', 'grp'),
+    )
+
+    month = Column(String, primary_key=True)  # "YYYY-MM" of created_at
+    grp = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    approved = Column(Integer, nullable=False, default=0)
+    denied = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ApplicationSummary(month={self.month}, grp={self.grp}, total={self.total})>"
+
+class MaintenanceLease(Base):
+    """Which worker runs scheduled maintenance, until `expires_at` (naive UTC)."""
+    __tablename__ = 'maintenance_leases'
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+# ─── Prompt Performance ───
+class Prompt(Base):
+    """Latest known text of each prompt, as reported with its runs."""
+    __tablename__ = 'prompts'
+
+    prompt_id = Column(String, primary_key=True)
+    prompt_text = Column(Text, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=_utcnow)
+
+class PromptRun(Base):
+    """One agent run of a prompt; metrics aggregate these over a time window."""
+    __tablename__ = 'prompt_runs'
+    __table_args__ = (
+        Index('ix_prompt_runs_prompt_time', 'prompt_id', 'created_at'),
+        Index('ix_prompt_runs_created_at', 'created_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Optional client ID; re-sent runs with the same ID are skipped
+    run_id = Column(String, unique=True, nullable=True)
+    prompt_id = Column(String, nullable=False)
+    passed = Column(Boolean, nullable=False)
+    trust_score = Column(Float, nullable=False)
+    hallucination = Column(Boolean, nullable=False, default=False)
+    failure_pattern = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=_utcnow)
+
+    def __repr__(self):
+        return f"<PromptRun(prompt_id={self.prompt_id}, passed={self.passed})>"
+
+class PromptPerformanceLog(Base):
+    __tablename__ = 'prompt_performance_log'
+    __table_args__ = (
+        Index('idx_prompt_perf_id_time', 'prompt_id', 'analyzed_at'),
+        Index('idx_prompt_perf_rates', 'pass_rate', 'trust_score'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    prompt_id = Column(String(255), nullable=False)
+    prompt_text = Column(Text, nullable=False)
+    pass_rate = Column(Float, nullable=False)
+    trust_score = Column(Float, nullable=False)
+    hallucination_rate = Column(Float, nullable=False)
+    total_runs = Column(Integer, nullable=False)
+    failure_patterns = Column(JSON, nullable=True)
+    analyzed_at = Column(DateTime, default=_utcnow, server_default=text(SQL_UTCNOW_DEFAULT))
+
+class PromptOptimization(Base):
+    __tablename__ = 'prompt_optimizations'
+    __table_args__ = (
+        Index('idx_opt_status_time', 'status', 'generated_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    prompt_id = Column(String(255), nullable=False)
+    original_prompt = Column(Text, nullable=False)
+    optimized_prompt = Column(Text, nullable=False)
+    optimization_strategy = Column(String(100), nullable=False)
+    original_pass_rate = Column(Float, nullable=False)
+    original_trust_score = Column(Float, nullable=False)
+    generated_at = Column(DateTime, default=_utcnow, server_default=text(SQL_UTCNOW_DEFAULT))
+    status = Column(String(50), default='ready_for_testing', server_default='ready_for_testing')
+    version = Column(String(50), nullable=False)
+    approval_notes = Column(Text, nullable=True)
+
+class PromptDeployment(Base):
+    __tablename__ = 'prompt_deployments'
+    __table_args__ = (
+        Index('idx_deploy_status_time', 'status', 'deployed_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    deployment_id = Column(String(255), unique=True, nullable=False)
+    prompt_id = Column(String(255), nullable=False)
+    deployed_version = Column(String(50), nullable=False)
+    deployment_type = Column(String(50), nullable=False)
+    deployed_at = Column(DateTime, default=_utcnow, server_default=text(SQL_UTCNOW_DEFAULT))
+    status = Column(String(50), default='active', server_default='active')
+    expected_improvement = Column(Float, nullable=True)
+    actual_improvement = Column(Float, nullable=True)
+    rollback_at = Column(DateTime, nullable=True)
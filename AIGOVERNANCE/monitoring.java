@@ -1,31 +1,22 @@
+// HTTP Request Node - Fetch Deployment Alerts
+{
+  "method": "GET",
+  "url": "{{$env.GOVERNANCE_API}}/prompt-metrics/regressions",
+  "headers": {
+    "x-api-key": "{{$env.GOVERNANCE_API_KEY}}"
+  }
+}
+
 // Function Node - Performance Monitoring
+// The service compares each active deployment's pass rate after deployment
+// with the window before it, in SQL, and returns one alert per finding:
+// performance_regression (high) below -5%, underperforming_optimization
+// (medium) below half the expected improvement.
 function() {
-  const deployments = $input.all();
-  const alerts = [];
-  
-  for (const deploy of deployments) {
-    const data = deploy.json;
-    
-    // Check for performance regression
-    if (data.actual_improvement < -0.05) {
-      alerts.push({
-        type: 'performance_regression',
-        deployment_id: data.deployment_id,
-        severity: 'high',
-        message: `Prompt ${data.prompt_id} showing ${(data.actual_improvement * 100).toFixed(1)}% performance decline`
-      });
-    }
-    
-    // Check for insufficient improvement
-    if (data.actual_improvement < data.expected_improvement * 0.5) {
-      alerts.push({
-        type: 'underperforming_optimization',
-        deployment_id: data.deployment_id,
-        severity: 'medium',
-        message: `Optimization for ${data.prompt_id} achieving only ${(data.actual_improvement * 100).toFixed(1)}% improvement (expected ${(data.expected_improvement * 100).toFixed(1)}%)`
-      });
-    }
-  }
-  
-  return alerts;
+  return $input.all().map(alert => ({
+    type: alert.json.type,
+    deployment_id: alert.json.deployment_id,
+    severity: alert.json.severity,
+    message: alert.json.message
+  }));
 }
\ No newline at end of file
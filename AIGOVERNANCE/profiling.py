@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import hmac
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    PROFILE_DIR,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_HEADER,
+    PROFILE_INTERVAL_MS,
+    PROFILE_MAX_FILES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the service API key, as checked by main.get_api_key
+API_KEY_HEADER = b"x-api-key"
+
+# Leaf frames of threads that are parked rather than doing work
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+# ─── Profilers ───
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every thread at a fixed interval, so work
+    pushed onto the threadpool (e.g. shap_values) shows up alongside the
+    event loop. The profile is process-wide: requests, jobs and background
+    tasks running at the same time are sampled too. Output is collapsed-stack
+    text for flamegraph.pl/speedscope.
+    """
+    mode = "sampling"
+    scope = "process"
+    extension = ".collapsed"
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class CProfiler:
+    """
+    Deterministic cProfile of the event-loop thread, including every other
+    coroutine it runs meanwhile; threadpool work is not seen. Writes a pstats
+    dump.
+    """
+    mode = "cprofile"
+    scope = "event_loop"
+    extension = ".prof"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path: Path):
+        pstats.Stats(self.profile).dump_stats(str(path))
+
+def _new_profiler():
+    return CProfiler() if PROFILE_MODE == "cprofile" else SamplingProfiler()
+
+# ─── Profile Storage ───
+def _profile_dir() -> Path:
+    path = Path(PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def save_profile(profile_id: str, profiler, meta: dict):
+    directory = _profile_dir()
+    filename = f"{profile_id}{profiler.extension}"
+    profiler.write(directory / filename)
+    meta = dict(meta, id=profile_id, mode=profiler.mode, scope=profiler.scope, file=filename)
+    (directory / f"{profile_id}.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    # Keep only the newest PROFILE_MAX_FILES profiles
+    metas = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in metas[PROFILE_MAX_FILES:]:
+        for path in directory.glob(f"{stale.stem}.*"):
+            path.unlink(missing_ok=True)
+
+def list_profiles():
+    directory = Path(PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    metas = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [json.loads(p.read_text(encoding="utf-8")) for p in metas]
+
+def profile_path(profile_id: str):
+    """Path of a stored profile file, or None if there is no such profile."""
+    meta_path = Path(PROFILE_DIR) / f"{Path(profile_id).name}.json"
+    if not meta_path.is_file():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    path = Path(PROFILE_DIR) / meta["file"]
+    return path if path.is_file() else None
+
+# ─── ASGI Middleware ───
+class ProfilingMiddleware:
+    """
+    Profiles a request when it carries the PROFILE_HEADER header together
+    with a valid x-api-key (`api_key`), or is picked by PROFILE_SAMPLE_RATE.
+    The middleware runs before routing, so it checks the key itself; without
+    one, the header is ignored. Only installed when PROFILING_ENABLED is set, so
+    there is no per-request cost otherwise. The profile ID is returned in the
+    same header on the response. Profiles are not isolated to the request:
+    see each profiler's `scope`, which is stored with the profile.
+    """
+    def __init__(self, app, api_key: str, sample_rate: float = PROFILE_SAMPLE_RATE, header: str = PROFILE_HEADER):
+        self.app = app
+        self.api_key = api_key.encode("latin-1")
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        # One profile at a time: overlapping profilers would attribute each other's work
+        self._active = threading.Lock()
+
+    def _should_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers", ()))
+        requested = headers.get(self.header, b"") not in (b"", b"0", b"false")
+        if requested and hmac.compare_digest(headers.get(API_KEY_HEADER, b""), self.api_key):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self._should_profile(scope)
+            or not self._active.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(self.header, profile_id.encode("latin-1"))]
+            await send(message)
+
+        profiler = _new_profiler()
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            self._active.release()
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "duration_ms": round(1000 * (time.perf_counter() - start), 3),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            try:
+                await run_in_threadpool(save_profile, profile_id, profiler, meta)
+            except Exception:
+                logger.error("Failed to store profile %s", profile_id, exc_info=True)
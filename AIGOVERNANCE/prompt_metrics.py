@@ -0,0 +1,152 @@
+import datetime
+
+from sqlalchemy import text, bindparam, DateTime
+
+from config import (
+    PROMPT_MIN_PASS_RATE,
+    PROMPT_MIN_TRUST_SCORE,
+    PROMPT_MAX_HALLUCINATION_RATE,
+    PROMPT_MIN_RUNS,
+    PROMPT_METRICS_WINDOW_HOURS,
+    PROMPT_REGRESSION_THRESHOLD,
+    PROMPT_UNDERPERFORMANCE_RATIO,
+    SQL_INSERT_PROMPT_RUN,
+    SQL_UPSERT_PROMPT_TEXT,
+    SQL_PROMPT_RUN_FILTERS,
+    SQL_PROMPT_METRICS,
+    SQL_PROMPT_FAILURE_PATTERNS,
+    SQL_PROMPT_REGRESSIONS,
+)
+
+# Most frequent failure patterns reported per prompt
+MAX_FAILURE_PATTERNS = 10
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+async def record_runs(session, runs) -> int:
+    """
+    Insert a batch of agent run results in one transaction and return how
+    many were new; runs whose run_id is already stored are skipped. Prompt
+    texts sent with the runs replace the stored ones.
+    """
+    now = _utcnow()
+    rows = [
+        {
+            "run_id": run.run_id,
+            "prompt_id": run.prompt_id,
+            "passed": run.passed,
+            "trust_score": run.trust_score,
+            "hallucination": run.hallucination,
+            "failure_pattern": run.failure_pattern,
+            "created_at": _naive_utc(run.created_at) or now,
+        }
+        for run in runs
+    ]
+    texts = {run.prompt_id: run.prompt_text for run in runs if run.prompt_text is not None}
+    insert = text(SQL_INSERT_PROMPT_RUN).bindparams(bindparam("created_at", type_=DateTime))
+    result = await session.execute(insert, rows)
+    if texts:
+        await session.execute(
+            text(SQL_UPSERT_PROMPT_TEXT).bindparams(bindparam("updated_at", type_=DateTime)),
+            [{"prompt_id": pid, "prompt_text": txt, "updated_at": now} for pid, txt in texts.items()]
+        )
+    await session.commit()
+    return result.rowcount
+
+def _window(since=None, until=None, prompt_id=None):
+    until = _naive_utc(until) or _utcnow()
+    since = _naive_utc(since) or until - datetime.timedelta(hours=PROMPT_METRICS_WINDOW_HOURS)
+    params = {"since": since, "until": until}
+    if prompt_id is not None:
+        params["prompt_id"] = prompt_id
+    where = " AND ".join(SQL_PROMPT_RUN_FILTERS[name] for name in params)
+    return where, params
+
+def _query(sql: str, where: str):
+    return text(sql.format(where=where)).bindparams(
+        bindparam("since", type_=DateTime), bindparam("until", type_=DateTime)
+    )
+
+async def load_metrics(session, since=None, until=None, prompt_id=None, needs_optimization=None) -> list:
+    """
+    Per-prompt pass rate, mean trust score and hallucination rate over runs
+    created in [since, until) (default: the last PROMPT_METRICS_WINDOW_HOURS),
+    worst pass rate first. Counts, rates and the needs_optimization flag are
+    computed by the database over the (prompt_id, created_at) indexes.
+    """
+    where, params = _window(since, until, prompt_id)
+    rows = (await session.execute(_query(SQL_PROMPT_METRICS, where), {
+        **params,
+        "min_runs": PROMPT_MIN_RUNS,
+        "min_pass_rate": PROMPT_MIN_PASS_RATE,
+        "min_trust_score": PROMPT_MIN_TRUST_SCORE,
+        "max_hallucination_rate": PROMPT_MAX_HALLUCINATION_RATE,
+    })).all()
+    patterns = {}
+    for pid, pattern, n in (await session.execute(_query(SQL_PROMPT_FAILURE_PATTERNS, where), params)).all():
+        found = patterns.setdefault(pid, [])
+        if len(found) < MAX_FAILURE_PATTERNS:
+            found.append({"pattern": pattern, "count": n})
+
+    metrics = []
+    for pid, prompt_text, passes, failures, trust, hallucinations, total, pass_rate, halluc_rate, flagged in rows:
+        if needs_optimization is not None and bool(flagged) != needs_optimization:
+            continue
+        metrics.append({
+            "prompt_id": pid,
+            "prompt_text": prompt_text,
+            "passes": passes,
+            "failures": failures,
+            "hallucinations": hallucinations,
+            "total_runs": total,
+            "pass_rate": pass_rate,
+            "trust_score": trust,
+            "hallucination_rate": halluc_rate,
+            "needs_optimization": bool(flagged),
+            "failure_patterns": patterns.get(pid, []),
+        })
+    return metrics
+
+def _percent(value) -> str:
+    return f"{value * 100:.1f}%" if value is not None else "n/a"
+
+async def load_regressions(session, window_hours: float = PROMPT_METRICS_WINDOW_HOURS) -> list:
+    """
+    Alerts for active deployments whose pass rate over the `window_hours`
+    after deployment fell, or rose by less than half what was expected,
+    compared with the `window_hours` before it.
+    """
+    rows = (await session.execute(text(SQL_PROMPT_REGRESSIONS), {
+        "before": f"-{window_hours} hours",
+        "after": f"+{window_hours} hours",
+        "min_runs": PROMPT_MIN_RUNS,
+        "regression_threshold": PROMPT_REGRESSION_THRESHOLD,
+        "underperformance_ratio": PROMPT_UNDERPERFORMANCE_RATIO,
+    })).all()
+    alerts = []
+    for kind, severity, deployment_id, pid, actual, expected, before, after in rows:
+        if kind == "performance_regression":
+            message = f"Prompt {pid} showing {_percent(actual)} performance decline"
+        else:
+            message = (
+                f"Optimization for {pid} achieving only {_percent(actual)} improvement "
+                f"(expected {_percent(expected)})"
+            )
+        alerts.append({
+            "type": kind,
+            "severity": severity,
+            "deployment_id": deployment_id,
+            "prompt_id": pid,
+            "actual_improvement": actual,
+            "expected_improvement": expected,
+            "pass_rate_before": before,
+            "pass_rate_after": after,
+            "message": message,
+        })
+    return alerts
@@ -0,0 +1,263 @@
+import os
+import uuid
+import asyncio
+import sqlite3
+import datetime
+import logging
+
+from sqlalchemy import text, bindparam, DateTime
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    RETENTION_HOT_MONTHS,
+    RETENTION_BATCH_SIZE,
+    RETENTION_ARCHIVE_DIR,
+    MAINTENANCE_INTERVAL_SECONDS,
+    MAINTENANCE_LEASE_SECONDS,
+    VACUUM_STEP_PAGES,
+    SQL_APPROVAL_COUNTS_FOR_GROUP,
+    SQL_APPROVAL_COUNTS_BY_GROUP,
+    SQL_SELECT_OLDEST_APPLICATION,
+    SQL_SELECT_EXPIRED_BATCH,
+    SQL_SUMMARIZE_APPLICATIONS,
+    SQL_DELETE_APPLICATIONS_BY_IDS,
+    SQL_CLAIM_MAINTENANCE_LEASE,
+)
+from database import AsyncSessionLocal, engine
+from metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Pause between write transactions so ingest can take the write lock
+STEP_PAUSE_SECONDS = 0.01
+# PRAGMA auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+ARCHIVE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS applications ("
+    "id INTEGER PRIMARY KEY, application_id VARCHAR NOT NULL UNIQUE, "
+    "features JSON NOT NULL, decision VARCHAR, created_at DATETIME)"
+)
+ARCHIVE_INSERT = (
+    "INSERT OR IGNORE INTO applications (id, application_id, features, decision, created_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def _month_start(value: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(value.year, value.month, 1)
+
+def _add_months(value: datetime.datetime, months: int) -> datetime.datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+def retention_cutoff(hot_months: int, now=None) -> datetime.datetime:
+    """Start of the oldest month kept in `applications`."""
+    return _add_months(_month_start(now or _utcnow()), -hot_months)
+
+# ─── Approval Counts Across Hot Rows and Summaries ───
+async def approval_counts(session, grp: str):
+    """(total, approved) for one group, including rolled-up months."""
+    total, approved = (await session.execute(text(SQL_APPROVAL_COUNTS_FOR_GROUP), {"grp": grp})).one()
+    return total, approved
+
+async def approval_counts_by_group(session) -> dict:
+    """{group: [total, approved]}, including rolled-up months; ungrouped rows are skipped."""
+    rows = (await session.execute(text(SQL_APPROVAL_COUNTS_BY_GROUP))).all()
+    return {grp: [total or 0, approved or 0] for grp, total, approved in rows}
+
+# ─── Retention Rollup ───
+def archive_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"applications_{month.replace('-', '_')}.db")
+
+def _archive_rows(path: str, rows):
+    # One file per month; re-running a batch after a crash is a no-op
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(ARCHIVE_SCHEMA)
+            conn.executemany(ARCHIVE_INSERT, [
+                (id_, application_id, features, decision,
+                 created_at.isoformat(sep=" ") if isinstance(created_at, datetime.datetime) else created_at)
+                for id_, application_id, features, decision, created_at in rows
+            ])
+    finally:
+        conn.close()
+
+async def roll_partitions(
+    session_factory=AsyncSessionLocal,
+    hot_months: int = RETENTION_HOT_MONTHS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    archive_dir: str = RETENTION_ARCHIVE_DIR,
+    now=None,
+) -> dict:
+    """
+    Move applications created before the last `hot_months` whole months out
+    of the hot table, oldest month first. Each batch is exported to its
+    month's archive file (nothing reads those back; open them directly), then added to application_summaries and deleted in one
+    short transaction, so ingest keeps running in between. A batch whose
+    rows another worker already rolled adds nothing, so concurrent or
+    repeated runs never double count. Rows without a created_at stay.
+    """
+    cutoff = retention_cutoff(hot_months, now)
+    oldest_query = text(SQL_SELECT_OLDEST_APPLICATION).columns(oldest=DateTime)
+    batch_query = text(SQL_SELECT_EXPIRED_BATCH).bindparams(bindparam("end", type_=DateTime))
+    summarize = text(SQL_SUMMARIZE_APPLICATIONS).bindparams(bindparam("ids", expanding=True))
+    delete = text(SQL_DELETE_APPLICATIONS_BY_IDS).bindparams(bindparam("ids", expanding=True))
+
+    months = {}
+    while True:
+        async with session_factory() as session:
+            oldest = (await session.execute(oldest_query)).scalar()
+        if oldest is None or oldest >= cutoff:
+            break
+        start = _month_start(oldest)
+        end = _add_months(start, 1)
+        month = start.strftime("%Y-%m")
+
+        while True:
+            async with session_factory() as session:
+                rows = (await session.execute(batch_query, {"end": end, "limit": batch_size})).all()
+            if not rows:
+                break
+            if archive_dir:
+                with stage_timer("retention_archive"):
+                    await run_in_threadpool(_archive_rows, archive_path(archive_dir, month), rows)
+            ids = [row[0] for row in rows]
+            async with session_factory() as session:
+                with stage_timer("retention_rollup"):
+                    await session.execute(summarize, {"month": month, "ids": ids})
+                    deleted = (await session.execute(delete, {"ids": ids})).rowcount
+                    await session.commit()
+            months[month] = months.get(month, 0) + deleted
+            await asyncio.sleep(STEP_PAUSE_SECONDS)
+        logger.info("Rolled %d applications from %s into summaries", months.get(month, 0), month)
+
+    return {
+        "cutoff": cutoff.isoformat(),
+        "rolled": sum(months.values()),
+        "months": months,
+    }
+
+# ─── Compaction ───
+_vacuum_hint_logged = False
+
+async def compact(db_engine=engine, step_pages: int = VACUUM_STEP_PAGES) -> dict:
+    """
+    Give free pages back to the filesystem `step_pages` at a time, each step
+    its own short write transaction, then checkpoint the WAL without waiting
+    for readers and refresh planner statistics. SQLite only.
+    """
+    global _vacuum_hint_logged
+    if db_engine.dialect.name != "sqlite":
+        return {}
+
+    freed = steps = 0
+    async with db_engine.connect() as conn:
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        if auto_vacuum == AUTO_VACUUM_INCREMENTAL:
+            # execute() steps a pragma only once (one page); a script runs it to completion
+            driver = (await conn.get_raw_connection()).driver_connection
+            free = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar() or 0
+            while free:
+                with stage_timer("incremental_vacuum"):
+                    await driver.executescript(f"PRAGMA incremental_vacuum({int(step_pages)});")
+                remaining = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar() or 0
+                steps += 1
+                if remaining >= free:
+                    break
+                freed += free - remaining
+                free = remaining
+                await asyncio.sleep(STEP_PAUSE_SECONDS)
+        elif not _vacuum_hint_logged:
+            _vacuum_hint_logged = True
+            logger.warning(
+                "auto_vacuum is off for this database, so freed pages are only reused, "
+                "never returned; see DEPLOYMENT.md to enable incremental compaction"
+            )
+        busy, wal_pages, checkpointed = (await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")).one()
+        await conn.exec_driver_sql("PRAGMA optimize")
+        await conn.commit()
+
+    return {
+        "incremental": auto_vacuum == AUTO_VACUUM_INCREMENTAL,
+        "freed_pages": freed,
+        "vacuum_steps": steps,
+        "wal_pages": wal_pages,
+        "wal_checkpointed": checkpointed,
+    }
+
+async def run_maintenance(retention: bool, hot_months: int = RETENTION_HOT_MONTHS) -> dict:
+    result = {}
+    if retention:
+        result["retention"] = await roll_partitions(hot_months=hot_months)
+    result["compaction"] = await compact()
+    return result
+
+async def claim_lease(session_factory, owner: str, ttl: float, name: str = "maintenance", now=None) -> bool:
+    """Take or renew the named lease for `ttl` seconds; False while another owner holds it."""
+    now = now or _utcnow()
+    claim = text(SQL_CLAIM_MAINTENANCE_LEASE).bindparams(
+        bindparam("expires_at", type_=DateTime), bindparam("now", type_=DateTime)
+    )
+    async with session_factory() as session:
+        result = await session.execute(claim, {
+            "name": name,
+            "owner": owner,
+            "expires_at": now + datetime.timedelta(seconds=ttl),
+            "now": now,
+        })
+        await session.commit()
+    return result.rowcount > 0
+
+class MaintenanceScheduler:
+    """
+    Runs run_maintenance every `interval` seconds in the background, first
+    after one interval. Every worker starts one, but only the worker holding
+    the maintenance lease runs it; the lease is renewed each run, and another
+    worker takes over once it has lapsed for `lease` seconds.
+    """
+    def __init__(
+        self,
+        retention: bool,
+        interval: float = MAINTENANCE_INTERVAL_SECONDS,
+        lease: float = MAINTENANCE_LEASE_SECONDS,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.retention = retention
+        self.interval = interval
+        self.lease = lease
+        self.session_factory = session_factory
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> bool:
+        """Run maintenance if this worker holds the lease; True if it ran."""
+        if not await claim_lease(self.session_factory, self.owner, self.lease):
+            return False
+        await run_maintenance(self.retention)
+        return True
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.error("Database maintenance failed", exc_info=True)
@@ -1,29 +1,166 @@
-from pydantic import BaseModel
-from typing import Optional, Dict
-
-class IngestRequest(BaseModel):
-    application_id: str
-    features: dict
-
-class IngestResponse(BaseModel):
-    status: str
-
-class DisparateImpactRequest(BaseModel):
-    privileged: str
-    unprivileged: str
-
-class DisparateImpactResponse(BaseModel):
-    ratio: float
-
-class ExplainRequest(BaseModel):
-    application_id: str
-
-class ExplainResponse(BaseModel):
-    contributions: dict
-
-class AgentRequest(BaseModel):
-    prompt: str
-
-class AgentResponse(BaseModel):
-    response: str
-    tool_result: Optional[Dict] = None
+from pydantic import BaseModel, Field
+from typing import Any, Optional, Dict, List, Literal
+from datetime import datetime
+
+from config import COUNTERFACTUAL_MAX_RESULTS
+
+class IngestRequest(BaseModel):
+    application_id: str
+    features: dict
+
+class IngestResponse(BaseModel):
+    status: str
+
+class DisparateImpactRequest(BaseModel):
+    privileged: str
+    unprivileged: str
+
+class DisparateImpactResponse(BaseModel):
+    ratio: float
+
+ExplainMode = Literal["exact", "approximate", "tree_limit", "interventional"]
+
+class ApplicationRecord(BaseModel):
+    id: int
+    application_id: str
+    decision: Optional[str] = None
+    group: Optional[Any] = None
+    created_at: Optional[datetime] = None
+    features: dict
+
+class ApplicationPage(BaseModel):
+    items: List[ApplicationRecord]
+    next_cursor: Optional[int] = None
+
+class ExplainRequest(BaseModel):
+    application_id: str
+    mode: Optional[ExplainMode] = None
+    latency_budget_ms: Optional[float] = None
+
+class ExplainErrorBound(BaseModel):
+    max_abs_error: float
+    mean_abs_error: float
+    relative_error: float
+    ms_per_row: float
+    validation_rows: int
+
+class ExplainResponse(BaseModel):
+    contributions: dict
+    mode: Optional[str] = None
+    error_bound: Optional[ExplainErrorBound] = None
+
+class CalibrationResponse(BaseModel):
+    calibrated: bool
+    modes: Dict[str, ExplainErrorBound]
+
+class CounterfactualRequest(BaseModel):
+    application_id: str
+    desired_class: Optional[str] = None
+    time_budget_ms: Optional[float] = None
+    max_results: int = Field(3, ge=1, le=COUNTERFACTUAL_MAX_RESULTS)
+    seed: Optional[int] = None
+
+class FeatureChange(BaseModel):
+    # Category name for categorical features, number otherwise
+    from_: Any = Field(None, alias="from")
+    to: Any = None
+
+class Counterfactual(BaseModel):
+    changes: Dict[str, FeatureChange]
+    distance: float
+    predicted_class: str
+    probability: float
+
+class CounterfactualResponse(BaseModel):
+    original_class: str
+    probability: float
+    counterfactuals: List[Counterfactual]
+    evaluated: int
+    iterations: int
+    elapsed_ms: float
+    budget_exhausted: bool
+
+class FeatureImportanceRequest(BaseModel):
+    groups: Optional[List[str]] = None
+    mode: Optional[ExplainMode] = None
+
+class ImportanceSummary(BaseModel):
+    count: int
+    mean_abs: Dict[str, float]
+    mean: Dict[str, float]
+
+class FeatureImportanceResponse(BaseModel):
+    model_version: str
+    mode: str
+    overall: ImportanceSummary
+    groups: Dict[str, ImportanceSummary]
+
+class AgentRequest(BaseModel):
+    prompt: str
+
+class AgentResponse(BaseModel):
+    response: str
+    tool_result: Optional[Dict] = None
+
+class JobRequest(BaseModel):
+    kind: str
+    params: Dict = {}
+    priority: int = 0
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    priority: int
+    progress: float
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+class PromptRun(BaseModel):
+    prompt_id: str
+    passed: bool
+    trust_score: float = Field(ge=0.0, le=1.0)
+    hallucination: bool = False
+    failure_pattern: Optional[str] = None
+    run_id: Optional[str] = None
+    prompt_text: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class PromptRunsRequest(BaseModel):
+    runs: List[PromptRun] = Field(min_length=1)
+
+class PromptRunsResponse(BaseModel):
+    inserted: int
+    skipped: int
+
+class FailurePattern(BaseModel):
+    pattern: str
+    count: int
+
+class PromptMetrics(BaseModel):
+    prompt_id: str
+    prompt_text: Optional[str] = None
+    passes: int
+    failures: int
+    hallucinations: int
+    total_runs: int
+    pass_rate: float
+    trust_score: float
+    hallucination_rate: float
+    needs_optimization: bool
+    failure_patterns: List[FailurePattern]
+
+class PromptRegressionAlert(BaseModel):
+    type: str
+    severity: str
+    deployment_id: str
+    prompt_id: str
+    actual_improvement: Optional[float] = None
+    expected_improvement: Optional[float] = None
+    pass_rate_before: Optional[float] = None
+    pass_rate_after: Optional[float] = None
+    message: str
@@ -0,0 +1,241 @@
+# scripts/benchmark.py
+#
+# Load-test every endpoint in-process (or against --base-url) and report
+# p50/p95/p99 latency and RPS as JSON that can be compared across commits:
+#
+#   python scripts/benchmark.py -n 2000 -c 32 --output bench.json
+#   python scripts/benchmark.py -n 2000 -c 32 --compare bench.json
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from pathlib import Path
+
+# Ensure project root is on the path so we can import the service modules
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+ENDPOINTS = ("ingest", "disparate_impact", "explain", "agent")
+API_HEADERS = {"x-api-key": os.getenv("X_API_KEY", "secret-key")}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the loan fairness service endpoints")
+    parser.add_argument("-n", "--applications", type=int, default=1000,
+                        help="synthetic applications to ingest (also requests per endpoint)")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=None,
+                        help="requests per read endpoint (default: --applications)")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"comma-separated subset of {','.join(ENDPOINTS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", default=None,
+                        help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to diff against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit non-zero if any p95 regresses by more than this fraction")
+    return parser.parse_args(argv)
+
+# ─── Synthetic Workload ───
+def build_applications(n: int, seed: int):
+    from synthetic_loan_generator import generate_applications
+
+    df = generate_applications(n, seed=seed)
+    applications = []
+    for row in df.to_dict(orient="records"):
+        row.pop("timestamp")
+        application_id = row.pop("application_id")
+        features = {
+            "score": int(row["credit_score"]),
+            "income": float(row["annual_income"]),
+            "group": row["sex"],
+        }
+        for key, value in row.items():
+            features.setdefault(key, value.item() if hasattr(value, "item") else value)
+        applications.append({"application_id": f"bench-{seed}-{application_id}", "features": features})
+    return applications
+
+def install_llm_stub():
+    """Replace the OpenAI client with a canned function-calling responder."""
+    import tools
+
+    def create(model, messages, functions=None, function_call=None):
+        if functions:
+            call = SimpleNamespace(
+                name="disparate_impact",
+                arguments=json.dumps({"privileged": "Male", "unprivileged": "Female"})
+            )
+            message = SimpleNamespace(function_call=call, content=None)
+        else:
+            message = SimpleNamespace(function_call=None, content="Stubbed summary.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    tools.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+# ─── Load Generator ───
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+async def run_phase(client, requests, concurrency: int):
+    """Issue (method, url, kwargs) requests with `concurrency` workers; return stats."""
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                method, url, kwargs = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, url, headers=API_HEADERS, **kwargs)
+                ok = resp.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 99), 3),
+    }
+
+def build_phases(endpoints, applications, n_requests: int, seed: int):
+    rng = random.Random(seed)
+    groups = ("Male", "Female")
+    phases = {}
+    if "ingest" in endpoints:
+        phases["ingest"] = [("POST", "/ingest", {"json": app}) for app in applications]
+    if "disparate_impact" in endpoints:
+        phases["disparate_impact"] = [
+            ("GET", "/bias/disparate-impact", {"params": {"privileged": groups[0], "unprivileged": groups[1]}})
+            for _ in range(n_requests)
+        ]
+    if "explain" in endpoints:
+        phases["explain"] = [
+            ("POST", "/explain", {"json": {"application_id": rng.choice(applications)["application_id"]}})
+            for _ in range(n_requests)
+        ]
+    if "agent" in endpoints:
+        prompt = "What's the bias between Male and Female?"
+        phases["agent"] = [("POST", "/agent", {"json": {"prompt": prompt}}) for _ in range(n_requests)]
+    return phases
+
+async def run_benchmark(args):
+    import httpx
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    applications = build_applications(args.applications, args.seed)
+    phases = build_phases(endpoints, applications, args.requests or args.applications, args.seed)
+    # Reads need data, so ingest runs even when it is not being reported
+    if "ingest" not in phases and {"disparate_impact", "explain"} & set(endpoints):
+        phases = {"_seed": [("POST", "/ingest", {"json": app}) for app in applications], **phases}
+
+    results = {}
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0) as client:
+            for name, requests in phases.items():
+                results[name] = await run_phase(client, requests, args.concurrency)
+    else:
+        from main import app
+        install_llm_stub()
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+                for name, requests in phases.items():
+                    results[name] = await run_phase(client, requests, args.concurrency)
+    results.pop("_seed", None)
+    return results
+
+# ─── Reporting ───
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def compare(report, baseline, max_regression=None) -> bool:
+    """Print per-endpoint deltas; return False if a p95 regression exceeds the limit."""
+    ok = True
+    print(f"{'endpoint':<18}{'p95 base':>10}{'p95 now':>10}{'delta':>9}{'rps base':>10}{'rps now':>10}")
+    for name, now in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        delta = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        print(f"{name:<18}{base['p95_ms']:>10.2f}{now['p95_ms']:>10.2f}{delta:>+9.1%}{base['rps']:>10.1f}{now['rps']:>10.1f}")
+        if max_regression is not None and delta > max_regression:
+            ok = False
+    return ok
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.base_url:
+        # Keep the benchmark off the real database and the real LLM
+        os.environ.setdefault(
+            "DATABASE_URL",
+            f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='nokware-bench-'), 'bench.db')}"
+        )
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark-stub")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("MODEL_PATH", str(ROOT / "model.pkl"))
+
+    results = asyncio.run(run_benchmark(args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "applications": args.applications,
+            "concurrency": args.concurrency,
+            "target": args.base_url or "in-process",
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not compare(report, baseline, args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
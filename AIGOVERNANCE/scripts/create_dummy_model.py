@@ -1,23 +1,28 @@
-# scripts/create_dummy_model.py
-
-import sys
-from pathlib import Path
-
-# Ensure project root is on the path so we can import FEATURE_ORDER
-sys.path.append(str(Path(__file__).parent.parent))
-
-import pickle
-from sklearn.tree import DecisionTreeClassifier  # CHANGED
-from app import FEATURE_ORDER
-
-# CHANGED: Use a tree‐based classifier so TreeExplainer works
-model = DecisionTreeClassifier(max_depth=1, random_state=0)
-# Fit on one dummy example of the right feature length
-model.fit([[0] * len(FEATURE_ORDER)], [0])
-
-# Serialize to model.pkl in the app directory
-output_path = Path(__file__).parent.parent / "model.pkl"
-with open(output_path, "wb") as f:
-    pickle.dump(model, f)
-
-print(f"✅ Created dummy DecisionTreeClassifier model at {output_path}")
+# scripts/create_dummy_model.py
+
+import sys
+from pathlib import Path
+
+# Ensure project root is on the path so we can import FEATURE_ORDER
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pickle
+from sklearn.tree import DecisionTreeClassifier  # CHANGED
+from config import FEATURE_ORDER
+
+# CHANGED: Use a tree‐based classifier so TreeExplainer works
+model = DecisionTreeClassifier(max_depth=1, random_state=0)
+# Two dummy examples of the right feature length: a single split on score
+# (0 = denied below 500, 1 = approved above), so decisions can flip
+denied = [0] * len(FEATURE_ORDER)
+approved = [0] * len(FEATURE_ORDER)
+denied[FEATURE_ORDER.index("score")] = 300
+approved[FEATURE_ORDER.index("score")] = 700
+model.fit([denied, approved], [0, 1])
+
+# Serialize to model.pkl in the app directory
+output_path = Path(__file__).parent.parent / "model.pkl"
+with open(output_path, "wb") as f:
+    pickle.dump(model, f)
+
+print(f"✅ Created dummy DecisionTreeClassifier model at {output_path}")
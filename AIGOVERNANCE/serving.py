@@ -0,0 +1,71 @@
+import gc
+import asyncio
+import hashlib
+import pickle
+import logging
+
+from config import MODEL_PATH
+from database import init_db, engine
+
+logger = logging.getLogger(__name__)
+
+# Set by preload() in the gunicorn master and inherited copy-on-write by workers
+preloaded = False
+model = None
+explainer = None
+version = None
+
+def load_model(path: str):
+    # Load with a closed file handle
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def model_version(path: str = MODEL_PATH):
+    """Short content hash of the model artifact, or None if there is none."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()[:16]
+
+def load_model_and_explainer(path: str = MODEL_PATH):
+    # shap pulls in numba/llvmlite; only pay for it when a model is actually loaded
+    import shap
+
+    loaded = load_model(path)
+    return loaded, shap.TreeExplainer(loaded)
+
+def preload():
+    """
+    One-time setup in the parent process before workers are forked: create
+    the schema, recover interrupted jobs, and load the model and explainer so
+    every worker shares the same pages instead of unpickling its own copy.
+    """
+    global preloaded, model, explainer, version
+    from jobs import recover_interrupted_jobs
+
+    async def _prepare_database():
+        await init_db()
+        await recover_interrupted_jobs()
+        # Forked workers must not inherit pooled connections
+        await engine.dispose()
+
+    asyncio.run(_prepare_database())
+    logger.info("Database initialized in master process")
+
+    try:
+        model, explainer = load_model_and_explainer(MODEL_PATH)
+        version = model_version(MODEL_PATH)
+        logger.info("Preloaded model and SHAP explainer from %s", MODEL_PATH)
+    except FileNotFoundError:
+        model, explainer = None, None
+        logger.warning("Model file not found at %s, /explain endpoint will be disabled", MODEL_PATH)
+
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers don't write to (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+    preloaded = True
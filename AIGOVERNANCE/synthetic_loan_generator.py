@@ -1,43 +1,279 @@
-# synthetic_loan_generator.py
-
-import pandas as pd
-import numpy as np
-import uuid
-import datetime
-
-# Configuration: target proportions for attributes
-N = 5000
-race_probs = {"White": 0.58, "Black": 0.12, "Asian": 0.06, "Hispanic": 0.18, "Other": 0.06}
-sex_probs = {"Male": 0.49, "Female": 0.51}
-age_probs = {"18-35": 0.35, "36-55": 0.40, "56+": 0.25}
-
-# Generate data
-data = {
-    "application_id": [str(uuid.uuid4()) for _ in range(N)],
-    "timestamp": [datetime.datetime.now(datetime.timezone.utc) for _ in range(N)],
-    "race": np.random.choice(list(race_probs), size=N, p=list(race_probs.values())),
-    "sex": np.random.choice(list(sex_probs), size=N, p=list(sex_probs.values())),
-    "age_group": np.random.choice(list(age_probs), size=N, p=list(age_probs.values())),
-    "approval_decision": np.random.choice([1, 0], size=N, p=[0.7, 0.3]),
-    "model_score": np.random.rand(N),
-    "loan_amount": np.random.normal(20000, 5000, N).clip(1000, 50000),
-    "loan_duration_months": np.random.choice([12, 24, 36, 48, 60], N),
-    "loan_purpose": np.random.choice(["car", "home", "education", "other"], N),
-    "annual_income": np.random.normal(80000, 20000, N).clip(20000, 200000),
-    "zipcode": np.random.choice(["98101","10001","60601","90210"], N),
-    "employment_length_years": np.random.choice([0,1,2,5,10,15], N),
-    "credit_score": np.random.choice([600,650,700,750,800], N),
-    "marital_status": np.random.choice(["Single","Married","Divorced"], N),
-    "education_level": np.random.choice(["HS","Bachelors","Masters","PhD"], N)
-}
-
-df = pd.DataFrame(data)
-
-# Quick distribution checks
-print("Race distribution:\n", df["race"].value_counts(normalize=True))
-print("\nSex distribution:\n", df["sex"].value_counts(normalize=True))
-print("\nAge group distribution:\n", df["age_group"].value_counts(normalize=True))
-
-# Save to CSV
-df.to_csv("synthetic_loan_data.csv", index=False)
-print("\n✅ synthetic_loan_data.csv saved with", len(df), "records.")
+# synthetic_loan_generator.py
+#
+# Seeded, chunked synthetic loan applications. Every column is drawn with
+# vectorized numpy calls, and chunks are streamed to the output one at a
+# time, so memory stays flat no matter how many rows are requested:
+#
+#   python synthetic_loan_generator.py                                  # 5000 rows -> synthetic_loan_data.csv
+#   python synthetic_loan_generator.py --rows 100000000 --format parquet --output loans.parquet
+#   python synthetic_loan_generator.py --rows 1000000 --format db --bias sex:Female=0.6
+
+import os
+import sys
+import argparse
+
+import pandas as pd
+import numpy as np
+
+# Configuration: target proportions for attributes
+N = 5000
+CHUNK_SIZE = 100_000
+APPROVAL_RATE = 0.7
+race_probs = {"White": 0.58, "Black": 0.12, "Asian": 0.06, "Hispanic": 0.18, "Other": 0.06}
+sex_probs = {"Male": 0.49, "Female": 0.51}
+age_probs = {"18-35": 0.35, "36-55": 0.40, "56+": 0.25}
+age_ranges = {"18-35": (18, 36), "36-55": (36, 56), "56+": (56, 86)}
+
+FORMATS = ("csv", "ndjson", "parquet", "db")
+
+# ─── Vectorized Column Builders ───
+_HEX = np.array([f"{i:02x}" for i in range(256)], dtype="S2")
+_UUID_GROUPS = ((0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20))
+
+def _uuid4_array(rng, n: int) -> np.ndarray:
+    """`n` RFC 4122 version-4 UUID strings built from one block of random bytes."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = _HEX[raw].view(np.uint8).reshape(n, 32)
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    for start, stop, src in _UUID_GROUPS:
+        out[:, start:stop] = hexed[:, src:src + stop - start]
+    return out.view("S36").ravel().astype(str)
+
+def _choice(rng, probs: dict, n: int) -> np.ndarray:
+    return rng.choice(np.array(list(probs)), size=n, p=list(probs.values()))
+
+def parse_bias(specs):
+    """['sex:Female=0.6', ...] -> {'sex': {'Female': 0.6}, ...}"""
+    bias = {}
+    for spec in specs or []:
+        try:
+            attribute, rest = spec.split(":", 1)
+            value, factor = rest.rsplit("=", 1)
+            bias.setdefault(attribute, {})[value] = float(factor)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid bias {spec!r}; expected attribute:value=factor")
+    return bias
+
+def generate_chunk(rng, n: int, start: np.datetime64, span_seconds: int,
+                   approval_rate: float = APPROVAL_RATE, bias=None) -> pd.DataFrame:
+    """
+    One chunk of `n` applications. `bias` maps attribute -> {value: factor};
+    each matching row's approval probability is multiplied by the factor, so
+    metrics such as disparate impact have a known effect to detect.
+    """
+    race = _choice(rng, race_probs, n)
+    sex = _choice(rng, sex_probs, n)
+    age_group = _choice(rng, age_probs, n)
+
+    low = np.empty(n, dtype=np.int64)
+    high = np.empty(n, dtype=np.int64)
+    for group, (lo, hi) in age_ranges.items():
+        mask = age_group == group
+        low[mask], high[mask] = lo, hi
+    age = rng.integers(low, high)
+
+    p_approve = np.full(n, approval_rate)
+    columns = {"race": race, "sex": sex, "age_group": age_group}
+    for attribute, factors in (bias or {}).items():
+        values = columns[attribute]
+        for value, factor in factors.items():
+            p_approve[values == value] *= factor
+    approval_decision = (rng.random(n) < np.clip(p_approve, 0.0, 1.0)).astype(np.int8)
+
+    offsets = rng.integers(0, max(span_seconds, 1), size=n).astype("timedelta64[s]")
+    return pd.DataFrame({
+        "application_id": _uuid4_array(rng, n),
+        "timestamp": pd.to_datetime(start + offsets).tz_localize("UTC"),
+        "race": race,
+        "sex": sex,
+        "age_group": age_group,
+        "age": age,
+        "approval_decision": approval_decision,
+        "model_score": rng.random(n),
+        "loan_amount": rng.normal(20000, 5000, n).clip(1000, 50000),
+        "loan_duration_months": rng.choice([12, 24, 36, 48, 60], n),
+        "loan_purpose": rng.choice(["car", "home", "education", "other"], n),
+        "annual_income": rng.normal(80000, 20000, n).clip(20000, 200000),
+        "zipcode": rng.choice(["98101", "10001", "60601", "90210"], n),
+        "employment_length_years": rng.choice([0, 1, 2, 5, 10, 15], n),
+        "credit_score": rng.choice([600, 650, 700, 750, 800], n),
+        "marital_status": rng.choice(["Single", "Married", "Divorced"], n),
+        "education_level": rng.choice(["HS", "Bachelors", "Masters", "PhD"], n)
+    })
+
+def iter_chunks(rows: int, chunk_size: int = CHUNK_SIZE, seed=None, start="2025-01-01",
+                days: int = 365, approval_rate: float = APPROVAL_RATE, bias=None):
+    """Yield DataFrames of at most `chunk_size` rows; same seed and chunk size give the same data."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(start, "s")
+    span = int(days * 86400)
+    for offset in range(0, rows, chunk_size):
+        yield generate_chunk(rng, min(chunk_size, rows - offset), start, span, approval_rate, bias)
+
+def generate_applications(n: int = N, seed=None, **kwargs) -> pd.DataFrame:
+    """Generate `n` synthetic loan applications in memory (small N only)."""
+    return pd.concat(list(iter_chunks(n, chunk_size=max(n, 1), seed=seed, **kwargs)), ignore_index=True)
+
+# ─── Streaming Writers ───
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.first = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="w" if self.first else "a", header=self.first, index=False)
+        self.first = False
+
+    def close(self):
+        pass
+
+class NdjsonWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, df):
+        text = df.to_json(orient="records", lines=True, date_format="iso")
+        # pandas ends the chunk with a newline (older versions don't)
+        self.f.write(text if text.endswith("\n") else text + "\n")
+
+    def close(self):
+        self.f.close()
+
+class ParquetWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, df):
+        table = self.pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class DatabaseWriter:
+    """
+    Load chunks straight into the `applications` table. Model features use
+    the service's field names and `group` is taken from `group_attribute`,
+    so /bias/disparate-impact works on the loaded data as-is.
+    """
+    def __init__(self, database_url: str, group_attribute: str = "sex"):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.engine import make_url
+        from config import SQL_INSERT_APPLICATION_RAW
+        from models import Base
+        from database import upgrade_schema
+
+        url = make_url(database_url)
+        # The service uses an async driver; bulk loading uses the sync default
+        self.engine = create_engine(url.set(drivername=url.get_backend_name()))
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as conn:
+            upgrade_schema(conn)
+        self.insert = text(SQL_INSERT_APPLICATION_RAW)
+        self.group_attribute = group_attribute
+
+    def write(self, df):
+        features = pd.DataFrame({
+            "age": df["age"],
+            "score": df["credit_score"],
+            "income": df["annual_income"].round(2),
+            "loan_amount": df["loan_amount"].round(2),
+            "loan_duration_months": df["loan_duration_months"],
+            "employment_length_years": df["employment_length_years"],
+            "loan_purpose": df["loan_purpose"],
+            "education_level": df["education_level"],
+            "zipcode": df["zipcode"],
+            "group": df[self.group_attribute],
+            "race": df["race"],
+            "sex": df["sex"],
+            "age_group": df["age_group"],
+        })
+        # pandas' C JSON encoder serialises the whole chunk in one call
+        encoded = features.to_json(orient="records", lines=True).splitlines()
+        decisions = np.where(df["approval_decision"].to_numpy() == 1, "approved", "denied")
+        # Naive UTC in the same text format SQLAlchemy's DateTime uses
+        created = df["timestamp"].dt.tz_convert(None).dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+        rows = [
+            {"application_id": app_id, "features": feats, "decision": decision, "created_at": created_at}
+            for app_id, feats, decision, created_at in zip(df["application_id"], encoded, decisions.tolist(), created)
+        ]
+        # One transaction and one executemany per chunk
+        with self.engine.begin() as conn:
+            conn.execute(self.insert, rows)
+
+    def close(self):
+        self.engine.dispose()
+
+def open_writer(fmt: str, output: str, database_url: str, group_attribute: str):
+    if fmt == "csv":
+        return CsvWriter(output)
+    if fmt == "ndjson":
+        return NdjsonWriter(output)
+    if fmt == "parquet":
+        return ParquetWriter(output)
+    return DatabaseWriter(database_url, group_attribute)
+
+# ─── CLI ───
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic loan applications")
+    parser.add_argument("--rows", type=int, default=N)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", default=None,
+                        help="output file (default: synthetic_loan_data.<format>)")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./nokware.db"),
+                        help="target for --format db")
+    parser.add_argument("--group-attribute", choices=("sex", "race", "age_group"), default="sex",
+                        help="attribute stored as features.group for --format db")
+    parser.add_argument("--start", default="2025-01-01", help="earliest application timestamp")
+    parser.add_argument("--days", type=float, default=365, help="timestamps spread over this many days")
+    parser.add_argument("--approval-rate", type=float, default=APPROVAL_RATE)
+    parser.add_argument("--bias", action="append", default=[], metavar="ATTR:VALUE=FACTOR",
+                        help="multiply the approval rate of a group, e.g. sex:Female=0.6 (repeatable)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    bias = parse_bias(args.bias)
+    for attribute in bias:
+        if attribute not in ("race", "sex", "age_group"):
+            raise SystemExit(f"Bias attribute must be race, sex or age_group, got {attribute!r}")
+    output = args.output or f"synthetic_loan_data.{'json' if args.format == 'ndjson' else args.format}"
+
+    writer = open_writer(args.format, output, args.database_url, args.group_attribute)
+    written = 0
+    approved = {}
+    try:
+        for df in iter_chunks(args.rows, args.chunk_size, args.seed, args.start,
+                              args.days, args.approval_rate, bias):
+            writer.write(df)
+            written += len(df)
+            for group, (total, hits) in df.groupby("sex")["approval_decision"].agg(["size", "sum"]).iterrows():
+                prev = approved.get(group, (0, 0))
+                approved[group] = (prev[0] + total, prev[1] + hits)
+            print(f"\r{written:,}/{args.rows:,} rows", end="", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+    print(file=sys.stderr)
+
+    # Quick distribution check on the injected effect
+    for group, (total, hits) in sorted(approved.items()):
+        print(f"Approval rate ({group}): {hits / total:.3f}")
+    target = "database" if args.format == "db" else output
+    print(f"\n✅ {written:,} records written to {target}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from conftest import API_HEADERS
+from counterfactuals import CounterfactualSearch
+from features import FEATURE_SCHEMA
+
+@pytest.fixture(scope="module")
+def threshold_model():
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(0)
+    X = FEATURE_SCHEMA.to_matrix([
+        {"age": int(a), "score": int(s), "income": float(i)}
+        for a, s, i in zip(rng.integers(18, 80, 2000), rng.integers(300, 850, 2000), rng.normal(80000, 20000, 2000))
+    ])
+    # Approved only with score > 650 and age > 40; age is immutable
+    y = ((X[:, 1] > 650) & (X[:, 0] > 40)).astype(int)
+    return DecisionTreeClassifier(random_state=0).fit(X, y), X
+
+def test_finds_nearest_flip_without_touching_immutable_fields(threshold_model):
+    model, X = threshold_model
+    x0 = FEATURE_SCHEMA.to_vector({"age": 50, "score": 600, "income": 80000})[0]
+    result = CounterfactualSearch(model).search(x0, time_budget_ms=2000, seed=1)
+
+    assert result["original_class"] == "0"
+    best = result["counterfactuals"][0]
+    assert best["predicted_class"] == "1"
+    assert list(best["changes"]) == ["score"]
+    assert 650 < best["changes"]["score"]["to"] <= 660
+    assert all("age" not in cf["changes"] for cf in result["counterfactuals"])
+
+def test_unknown_immutable_category_is_left_alone():
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(0)
+    zipcodes = ["99999", "00000", "98101", "10001"]
+    X = FEATURE_SCHEMA.to_matrix([
+        {"age": 40, "score": int(s), "zipcode": zipcodes[int(z)]}
+        for s, z in zip(rng.integers(300, 850, 2000), rng.integers(0, len(zipcodes), 2000))
+    ])
+    zipcode = FEATURE_SCHEMA.index["zipcode"]
+    # Approved with a listed zipcode, or with score > 650
+    y = ((X[:, zipcode] >= 0) | (X[:, 1] > 650)).astype(int)
+    model = DecisionTreeClassifier(random_state=0).fit(X, y)
+
+    x0 = FEATURE_SCHEMA.to_vector({"age": 40, "score": 600, "zipcode": "99999"})[0]
+    assert x0[zipcode] == -1
+    result = CounterfactualSearch(model).search(x0, time_budget_ms=2000, seed=1)
+
+    assert result["counterfactuals"]
+    assert all("zipcode" not in cf["changes"] for cf in result["counterfactuals"])
+    assert list(result["counterfactuals"][0]["changes"]) == ["score"]
+
+def test_no_feasible_flip_stops_within_budget(threshold_model):
+    model, _ = threshold_model
+    x0 = FEATURE_SCHEMA.to_vector({"age": 25, "score": 600})[0]
+    result = CounterfactualSearch(model).search(x0, time_budget_ms=100, seed=1)
+    assert result["counterfactuals"] == []
+    assert result["elapsed_ms"] < 1000
+
+def test_max_results_is_bounded_outside_the_http_schema(threshold_model):
+    model, _ = threshold_model
+    x0 = FEATURE_SCHEMA.to_vector({"age": 25, "score": 600})[0]
+    for max_results in (0, -1, 10**6, "3"):
+        with pytest.raises(ValueError):
+            CounterfactualSearch(model).search(x0, time_budget_ms=100, max_results=max_results)
+
+def test_counterfactual_endpoint(client, seed_applications):
+    seed_applications([("cf-1", {"age": 30, "score": 300, "income": 1}, "denied")])
+    resp = client.post(
+        "/counterfactual",
+        json={"application_id": "cf-1", "time_budget_ms": 200, "seed": 0},
+        headers=API_HEADERS
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["original_class"] == "0"
+    assert body["counterfactuals"][0]["changes"]["score"]["from"] == 300
+
+    resp = client.post("/counterfactual", json={"application_id": "cf-1", "desired_class": "7"}, headers=API_HEADERS)
+    assert resp.status_code == 400
+    resp = client.post("/counterfactual", json={"application_id": "cf-none"}, headers=API_HEADERS)
+    assert resp.status_code == 404
+    for max_results in (0, 10**6):
+        resp = client.post(
+            "/counterfactual", json={"application_id": "cf-1", "max_results": max_results}, headers=API_HEADERS
+        )
+        assert resp.status_code == 422
+
+def test_counterfactual_tool_rejects_bad_arguments(client, seed_applications):
+    from tools import call_tool
+
+    seed_applications([("cf-tool", {"age": 30, "score": 300, "income": 1}, "denied")])
+    result = client.portal.call(call_tool, "counterfactual", {"application_id": "cf-tool", "time_budget_ms": "soon"})
+    assert result["status"] == "rejected"
+    assert result["errors"][0].startswith("time_budget_ms:")
+
+    result = client.portal.call(
+        call_tool, "counterfactual", {"application_id": "cf-tool", "time_budget_ms": "100", "seed": 0}
+    )
+    assert result["original_class"] == "0"
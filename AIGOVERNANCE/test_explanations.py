@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from conftest import API_HEADERS
+from explanations import ExplanationService, MODES
+
+@pytest.fixture(scope="module")
+def forest_service():
+    shap = pytest.importorskip("shap")
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 9)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0.8).astype(int)
+    model = RandomForestClassifier(n_estimators=40, random_state=0).fit(X, y)
+    service = ExplanationService(model, shap.TreeExplainer(model), background_size=50, validation_size=32)
+    service._calibrate(X[:82])
+    return service
+
+def test_calibration_measures_every_mode_against_exact(forest_service):
+    calibration = forest_service.calibration
+    assert set(calibration) == set(MODES)
+    assert calibration["exact"]["max_abs_error"] == 0.0
+    assert calibration["tree_limit"]["max_abs_error"] > 0.0
+    assert all(stats["validation_rows"] == 32 for stats in calibration.values())
+
+def test_budget_picks_most_accurate_mode_that_fits(forest_service):
+    assert forest_service.select(10, latency_budget_ms=1e9) == "exact"
+    fastest = min(MODES, key=lambda m: forest_service.calibration[m]["ms_per_row"])
+    assert forest_service.select(10, latency_budget_ms=0.0) == fastest
+    assert forest_service.select(10, mode="tree_limit", latency_budget_ms=0.0) == "tree_limit"
+
+def test_tree_limit_counts_boosting_rounds():
+    from explanations import _tree_count
+
+    class XGBLike:
+        def get_booster(self):
+            return type("Booster", (), {"num_boosted_rounds": lambda self: 40})()
+
+    class LGBMLike:
+        booster_ = type("Booster", (), {"current_iteration": lambda self: 30})()
+
+    assert _tree_count(XGBLike()) == 40
+    assert _tree_count(LGBMLike()) == 30
+    assert ExplanationService(XGBLike(), None).tree_limit == 10
+    assert _tree_count(object()) is None
+
+def test_tree_limit_is_disabled_when_tree_count_is_unknown():
+    service = ExplanationService(object(), None)
+    assert not service.available("tree_limit")
+    assert service.select(1, mode="tree_limit") == "exact"
+
+def test_explain_reports_mode_and_error_bound(client, seed_applications):
+    seed_applications([("mode-1", {"age": 30, "score": 700, "income": 1}, None)])
+    assert client.post("/explain/calibrate", headers=API_HEADERS).json()["calibrated"] is True
+
+    resp = client.post(
+        "/explain", json={"application_id": "mode-1", "mode": "interventional"}, headers=API_HEADERS
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["mode"] == "interventional"
+    assert body["error_bound"]["validation_rows"] >= 1
+
+    resp = client.post("/explain", json={"application_id": "mode-1", "mode": "bogus"}, headers=API_HEADERS)
+    assert resp.status_code == 422
+
+def test_unknown_mode_is_rejected_outside_the_http_schema(client, seed_applications):
+    from tools import call_tool, explanations
+
+    with pytest.raises(ValueError):
+        explanations.select(1, mode="bogus")
+
+    seed_applications([("mode-2", {"age": 30, "score": 700, "income": 1}, None)])
+    result = client.portal.call(call_tool, "explain_application", {"application_id": "mode-2", "mode": "bogus"})
+    assert result["status"] == "rejected"
+
+    resp = client.post(
+        "/jobs", json={"kind": "batch_explain", "params": {"mode": "bogus"}}, headers=API_HEADERS
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import API_HEADERS
+from features import FEATURE_SCHEMA, FeatureValidationError
+
+def test_batch_encodes_to_contiguous_float32():
+    X = FEATURE_SCHEMA.to_matrix([
+        {"age": 30, "score": 720, "loan_purpose": "home"},
+        '{"zipcode": "99999", "group": "ignored"}',
+    ])
+    assert X.dtype == "float32"
+    assert X.flags["C_CONTIGUOUS"]
+    assert X.shape == (2, len(FEATURE_SCHEMA))
+
+    idx = FEATURE_SCHEMA.index
+    assert X[0, idx["age"]] == 30
+    assert X[0, idx["loan_purpose"]] == 1  # "home" is the second category
+    assert X[1, idx["loan_purpose"]] == 3  # default "other"
+    assert X[1, idx["zipcode"]] == -1      # unknown but allowed
+
+def test_validate_collects_every_error():
+    with pytest.raises(FeatureValidationError) as exc:
+        FEATURE_SCHEMA.validate({"age": "thirty", "score": True, "loan_purpose": "yacht", "income": -5})
+    fields = [msg.split(":")[0] for msg in exc.value.errors]
+    assert fields == ["age", "score", "income", "loan_purpose"]
+
+def test_validate_rejects_unhashable_categories_and_huge_numbers():
+    with pytest.raises(FeatureValidationError) as exc:
+        FEATURE_SCHEMA.validate({"income": 10**400, "loan_purpose": ["car"], "zipcode": {"code": "98101"}})
+    assert exc.value.errors == [
+        f"income: expected a finite number, got {10**400!r}",
+        "loan_purpose: expected a string, got ['car']",
+        "zipcode: expected a string, got {'code': '98101'}",
+    ]
+
+def test_ingest_rejects_unhashable_and_overflowing_values(client):
+    resp = client.post(
+        "/ingest",
+        json={"application_id": "bad-2", "features": {"score": 10**400, "education_level": {"a": 1}}},
+        headers=API_HEADERS
+    )
+    assert resp.status_code == 422
+    assert [msg.split(":")[0] for msg in resp.json()["detail"]] == ["score", "education_level"]
+
+def test_ingest_rejects_malformed_features(client):
+    resp = client.post(
+        "/ingest",
+        json={"application_id": "bad-1", "features": {"age": "thirty"}},
+        headers=API_HEADERS
+    )
+    assert resp.status_code == 422
+    assert resp.json()["detail"] == ["age: expected a finite number, got 'thirty'"]
+
+def test_explain_uses_full_schema(client):
+    client.post(
+        "/ingest",
+        json={"application_id": "schema-1", "features": {"age": 41, "score": 690, "education_level": "PhD"}},
+        headers=API_HEADERS
+    )
+    resp = client.post("/explain", json={"application_id": "schema-1"}, headers=API_HEADERS)
+    assert resp.status_code == 200
+    assert list(resp.json()["contributions"]) == FEATURE_SCHEMA.names
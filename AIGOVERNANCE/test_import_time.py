@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+# Cold import of the ingest-only path must stay under this many seconds
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+HEAVY_MODULES = ("shap", "numba", "llvmlite", "numpy", "openai", "sklearn", "pandas")
+
+PROBE = """
+import sys, time, json, asyncio
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+
+from database import init_db
+asyncio.run(init_db())
+from fastapi.testclient import TestClient
+resp = TestClient(main.app).post(
+    "/ingest",
+    json={"application_id": "cold-start", "features": {"age": 30, "score": 720}},
+    headers={"x-api-key": "secret-key"},
+)
+print(json.dumps({
+    "elapsed": elapsed,
+    "status": resp.status_code,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+def test_ingest_path_cold_start(tmp_path):
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)
+    env["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_path / 'cold.db'}"
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).parent, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+
+    assert result["status"] == 200
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_BUDGET_SECONDS
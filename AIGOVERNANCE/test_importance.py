@@ -0,0 +1,80 @@
+import sqlite3
+
+from conftest import API_HEADERS, DB_PATH
+
+def test_explanations_are_counted_once_per_application(client, seed_applications):
+    seed_applications([
+        ("imp-1", {"age": 30, "score": 700, "income": 1, "group": "imp-A"}, None),
+        ("imp-2", {"age": 40, "score": 650, "income": 2, "group": "imp-A"}, None),
+    ])
+    for application_id in ("imp-1", "imp-1", "imp-2"):
+        resp = client.post("/explain", json={"application_id": application_id}, headers=API_HEADERS)
+        assert resp.status_code == 200
+
+    resp = client.get("/explain/summary", params={"groups": ["imp-A", "imp-none"]}, headers=API_HEADERS)
+    assert resp.status_code == 200
+    groups = resp.json()["groups"]
+    assert groups["imp-A"]["count"] == 2
+    assert groups["imp-none"]["count"] == 0
+
+def test_summaries_are_kept_apart_per_mode(client, seed_applications):
+    seed_applications([("imp-mode-1", {"age": 30, "score": 700, "income": 1, "group": "imp-mode"}, None)])
+    for mode in ("exact", "approximate", "approximate"):
+        resp = client.post("/explain", json={"application_id": "imp-mode-1", "mode": mode}, headers=API_HEADERS)
+        assert resp.status_code == 200
+
+    for mode in ("exact", "approximate"):
+        body = client.get(
+            "/explain/summary", params={"groups": ["imp-mode"], "mode": mode}, headers=API_HEADERS
+        ).json()
+        assert body["mode"] == mode
+        assert body["groups"]["imp-mode"]["count"] == 1
+    body = client.get("/explain/summary", params={"groups": ["imp-mode"], "mode": "tree_limit"}, headers=API_HEADERS)
+    assert body.json()["groups"]["imp-mode"]["count"] == 0
+
+def test_summary_means_and_ranking(client):
+    import tools
+
+    version = tools.explanations.model_version
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO shap_summaries (model_version, mode, grp, feature, n, sum_abs, sum_signed) "
+            "VALUES (?, 'exact', ?, ?, ?, ?, ?)",
+            [(version, "rank-A", "age", 2, 1.0, -1.0), (version, "rank-A", "score", 2, 3.0, 3.0),
+             (version, "rank-B", "age", 4, 8.0, 8.0), (version, "rank-B", "score", 4, 2.0, 0.0),
+             ("an-older-model", "rank-A", "age", 100, 1000.0, 1000.0)]
+        )
+
+    body = client.get("/explain/summary", params={"groups": ["rank-A", "rank-B"]}, headers=API_HEADERS).json()
+    a, b = body["groups"]["rank-A"], body["groups"]["rank-B"]
+    assert list(a["mean_abs"]) == ["score", "age"]
+    assert a["mean_abs"] == {"score": 1.5, "age": 0.5}
+    assert a["mean"]["age"] == -0.5
+    assert list(b["mean_abs"]) == ["age", "score"]
+    assert body["overall"]["count"] >= 6
+    assert body["model_version"] == version
+
+def test_upgrade_rebuilds_unversioned_summaries(tmp_path):
+    from sqlalchemy import create_engine
+    from database import upgrade_schema
+
+    db = tmp_path / "old-shap.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE applications (id INTEGER PRIMARY KEY, application_id VARCHAR UNIQUE NOT NULL, "
+            "features JSON NOT NULL, decision VARCHAR, created_at DATETIME)"
+        )
+        conn.execute(
+            "CREATE TABLE shap_summaries (grp VARCHAR, feature VARCHAR, n INTEGER, sum_abs FLOAT, "
+            "sum_signed FLOAT, PRIMARY KEY (grp, feature))"
+        )
+        conn.execute("CREATE TABLE shap_explained (application_id VARCHAR PRIMARY KEY)")
+        conn.execute("INSERT INTO shap_summaries VALUES ('A', 'age', 1, 1.0, 1.0)")
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+    engine.dispose()
+    with sqlite3.connect(db) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(shap_explained)")]
+        assert conn.execute("SELECT COUNT(*) FROM shap_summaries").fetchone()[0] == 0
+    assert columns[:2] == ["model_version", "mode"]
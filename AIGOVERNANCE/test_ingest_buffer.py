@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from conftest import API_HEADERS, DB_PATH
+from ingest_buffer import IngestBuffer
+from models import Base
+
+class CountingBuffer(IngestBuffer):
+    commits = 0
+
+    async def _commit(self, rows):
+        self.commits += 1
+        await super()._commit(rows)
+
+def test_group_commit_skips_duplicates(tmp_path):
+    db = tmp_path / "buffer.db"
+    buffer = None
+
+    async def run():
+        nonlocal buffer
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        buffer = CountingBuffer(batch_size=16, flush_interval_ms=20, session_factory=factory)
+        await buffer.start()
+        # 60 submissions of 40 distinct IDs, all in flight at once
+        await asyncio.gather(*(
+            buffer.submit(f"buf-{i % 40}", {"group": "g", "score": i}) for i in range(60)
+        ))
+        await buffer.stop()
+        await engine.dispose()
+
+    asyncio.run(run())
+
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT application_id, json_extract(features, '$.score') FROM applications").fetchall()
+    assert len(rows) == 40
+    # First submission wins, as with the IntegrityError path
+    assert dict(rows)["buf-0"] == 0
+    assert buffer.commits <= 60 // 16 + 1
+
+def test_ingest_endpoint_acknowledges_after_commit(client):
+    buffer = IngestBuffer(flush_interval_ms=1)
+    client.portal.call(buffer.start)
+    client.app.state.ingest_buffer = buffer
+    try:
+        for _ in range(2):
+            resp = client.post(
+                "/ingest",
+                json={"application_id": "buffered-1", "features": {"age": 30, "group": "buf"}},
+                headers=API_HEADERS
+            )
+            assert resp.status_code == 200
+        # Acknowledged means committed: visible to another connection right away
+        with sqlite3.connect(DB_PATH) as conn:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM applications WHERE application_id = 'buffered-1'"
+            ).fetchone()[0]
+        assert count == 1
+    finally:
+        client.app.state.ingest_buffer = None
+        client.portal.call(buffer.stop)
+
+class FailingBuffer(IngestBuffer):
+    """Fails any commit that contains a row with application_id "bad"."""
+    async def _commit(self, rows):
+        if any(row["application_id"] == "bad" for row in rows):
+            raise sqlite3.IntegrityError("bad row")
+        await super()._commit(rows)
+
+def test_bad_row_fails_only_its_own_caller(tmp_path):
+    db = tmp_path / "retry.db"
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        buffer = FailingBuffer(batch_size=16, flush_interval_ms=20, session_factory=factory)
+        await buffer.start()
+        try:
+            with pytest.raises(ValueError):
+                await buffer.submit(None, {"group": "g"})
+            results = await asyncio.gather(
+                buffer.submit("ok-1", {"group": "g"}),
+                buffer.submit("bad", {"group": "g"}),
+                buffer.submit("ok-2", {"group": "g"}),
+                return_exceptions=True
+            )
+        finally:
+            await buffer.stop()
+            await engine.dispose()
+        return results
+
+    ok_1, bad, ok_2 = asyncio.run(run())
+    assert ok_1 is None and ok_2 is None
+    assert isinstance(bad, sqlite3.IntegrityError)
+    with sqlite3.connect(db) as conn:
+        stored = {r[0] for r in conn.execute("SELECT application_id FROM applications")}
+    assert stored == {"ok-1", "ok-2"}
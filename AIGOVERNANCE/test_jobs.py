@@ -0,0 +1,111 @@
+import json
+import sqlite3
+
+from conftest import API_HEADERS, DB_PATH, wait_for_job
+from features import FEATURE_SCHEMA
+
+def test_fairness_audit_job(client, seed_applications):
+    seed_applications([
+        ("audit-a1", {"group": "audit-A"}, "approved"),
+        ("audit-a2", {"group": "audit-A"}, "approved"),
+        ("audit-b1", {"group": "audit-B"}, "approved"),
+        ("audit-b2", {"group": "audit-B"}, "denied"),
+    ])
+    resp = client.post(
+        "/jobs",
+        json={"kind": "fairness_audit", "params": {"groups": ["audit-A", "audit-B"]}},
+        headers=API_HEADERS
+    )
+    assert resp.status_code == 202
+    job = wait_for_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert job["expires_at"] is not None
+    result = job["result"]
+    assert result["privileged"] == "audit-A"
+    assert result["disparate_impact"]["audit-B"] == 0.5
+
+def test_fairness_audit_window_and_intersections(client):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO applications (application_id, features, decision, created_at) VALUES (?, ?, ?, ?)",
+            [
+                ("win-a1", json.dumps({"group": "win-A", "loan_purpose": "car"}), "approved", "2021-01-20 10:00:00"),
+                ("win-a2", json.dumps({"group": "win-A", "loan_purpose": "car"}), "denied", "2021-03-20 10:00:00"),
+                ("win-b1", json.dumps({"group": "win-B", "loan_purpose": "home"}), "denied", "2021-02-01 10:00:00"),
+                ("win-b2", json.dumps({"group": "win-B", "loan_purpose": "home"}), "approved", "2021-01-01 10:00:00"),
+            ]
+        )
+        # 2021-02 lies inside the window; 2021-01 starts before it
+        conn.executemany(
+            "INSERT INTO application_summaries (month, grp, total, approved, denied) VALUES (?, ?, ?, ?, ?)",
+            [("2021-02", "win-A", 2, 1, 1), ("2021-01", "win-A", 5, 5, 0)]
+        )
+    resp = client.post(
+        "/jobs",
+        json={"kind": "fairness_audit", "params": {
+            "groups": ["win-A", "win-B"],
+            "since": "2021-01-15T00:00:00",
+            "until": "2021-03-15T00:00:00",
+            "intersect": ["loan_purpose"],
+        }},
+        headers=API_HEADERS
+    )
+    job = wait_for_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    result = job["result"]
+    assert result["window"] == {"since": "2021-01-15T00:00:00", "until": "2021-03-15T00:00:00"}
+    assert result["groups"]["win-A"] == {"total": 3, "approved": 2, "approval_rate": 2 / 3}
+    assert result["groups"]["win-B"] == {"total": 1, "approved": 0, "approval_rate": 0}
+    assert result["intersections"] == {
+        "win-A": {"loan_purpose": {"car": {"total": 1, "approved": 1, "approval_rate": 1.0}}},
+        "win-B": {"loan_purpose": {"home": {"total": 1, "approved": 0, "approval_rate": 0}}},
+    }
+
+def test_fairness_audit_rejects_bad_params(client):
+    for params in ({"since": "last week"}, {"intersect": ["income"]},
+                   {"since": "2021-02-01T00:00:00", "until": "2021-01-01T00:00:00"}):
+        resp = client.post("/jobs", json={"kind": "fairness_audit", "params": params}, headers=API_HEADERS)
+        assert resp.status_code == 400
+
+def test_batch_explain_job_reports_missing(client, seed_applications):
+    seed_applications([("explain-1", {"age": 30, "score": 700, "income": 1}, None)])
+    resp = client.post(
+        "/jobs",
+        json={"kind": "batch_explain", "params": {"application_ids": ["explain-1", "nope"]}},
+        headers=API_HEADERS
+    )
+    job = wait_for_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["explained"] == 1
+    assert job["result"]["missing"] == ["nope"]
+
+def test_batch_explain_whole_table_returns_aggregates_only(client, seed_applications):
+    seed_applications([(f"explain-all-{i}", {"age": 30 + i, "score": 600, "income": 1}, None) for i in range(3)])
+    resp = client.post("/jobs", json={"kind": "batch_explain", "params": {"chunk_size": 2}}, headers=API_HEADERS)
+    job = wait_for_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    result = job["result"]
+    assert result["explained"] >= 3
+    assert "contributions" not in result
+    assert set(result["mean_abs"]) == set(result["mean"]) == set(FEATURE_SCHEMA.names)
+
+def test_batch_explain_rejects_bad_chunk_size(client):
+    for chunk_size in (0, -5, "10", 10**9):
+        resp = client.post(
+            "/jobs", json={"kind": "batch_explain", "params": {"chunk_size": chunk_size}}, headers=API_HEADERS
+        )
+        assert resp.status_code == 400
+
+def test_unknown_job_kind_rejected(client):
+    resp = client.post("/jobs", json={"kind": "nope"}, headers=API_HEADERS)
+    assert resp.status_code == 400
+
+def test_unknown_job_not_found(client):
+    assert client.get("/jobs/does-not-exist", headers=API_HEADERS).status_code == 404
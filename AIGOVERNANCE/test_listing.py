@@ -0,0 +1,136 @@
+import csv
+import datetime
+import io
+import json
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from conftest import API_HEADERS, DB_PATH
+from database import upgrade_schema
+
+@pytest.fixture(scope="module")
+def listed(client):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO applications (application_id, features, decision, created_at) VALUES (?, ?, ?, ?)",
+            [
+                (f"list-{i}", json.dumps({"group": "list-A" if i % 2 else "list-B", "score": i}),
+                 "approved" if i % 3 else None, f"2024-01-{i + 1:02d} 00:00:00.000000")
+                for i in range(10)
+            ]
+        )
+
+def test_keyset_pages_cover_every_match_once(client, listed):
+    seen, cursor = [], None
+    while True:
+        params = {"group": "list-A", "limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/applications", params=params, headers=API_HEADERS).json()
+        seen += [item["application_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"list-{i}" for i in (1, 3, 5, 7, 9)]
+
+def test_filters_combine(client, listed):
+    page = client.get(
+        "/applications",
+        params={"decision": "pending", "created_after": "2024-01-02T00:00:00Z", "created_before": "2024-01-08"},
+        headers=API_HEADERS
+    ).json()
+    items = [item for item in page["items"] if item["application_id"].startswith("list-")]
+    assert [item["application_id"] for item in items] == ["list-3", "list-6"]
+    assert items[0]["group"] == "list-A"
+    assert items[0]["features"]["score"] == 3
+
+def test_export_streams_ndjson_and_csv(client, listed):
+    resp = client.get("/applications/export", params={"group": "list-B"}, headers=API_HEADERS)
+    assert resp.status_code == 200
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["application_id"] for row in rows] == [f"list-{i}" for i in (0, 2, 4, 6, 8)]
+    assert rows[0]["features"] == {"group": "list-B", "score": 0}
+
+    resp = client.get("/applications/export", params={"group": "list-B", "format": "csv"}, headers=API_HEADERS)
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert len(rows) == 5
+    assert rows[0]["created_at"] == "2024-01-01T00:00:00"
+
+    resp = client.get("/applications/export", params={"format": "xml"}, headers=API_HEADERS)
+    assert resp.status_code == 400
+
+def test_upgrade_adds_created_at_to_old_tables(tmp_path):
+    db = tmp_path / "old.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE applications (id INTEGER PRIMARY KEY, application_id VARCHAR UNIQUE NOT NULL, "
+            "features JSON NOT NULL, decision VARCHAR)"
+        )
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        upgrade_schema(conn)
+    with sqlite3.connect(db) as conn:
+        conn.executemany(
+            "INSERT INTO applications (application_id, features, created_at) VALUES (?, '{}', ?)",
+            [("old-1", "2024-02-01 00:00:00"), ("old-2", "2024-02-01T08:30:00"), ("new", "2024-02-01 09:00:00.250000")]
+        )
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+    engine.dispose()
+    with sqlite3.connect(db) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(applications)")]
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(applications)")]
+        created = dict(conn.execute("SELECT application_id, created_at FROM applications"))
+    assert "created_at" in columns
+    assert {"ix_applications_group", "ix_applications_created_at"} <= set(indexes)
+    assert created == {
+        "old-1": "2024-02-01 00:00:00.000000",
+        "old-2": "2024-02-01 08:30:00.000000",
+        "new": "2024-02-01 09:00:00.250000",
+    }
+
+def test_created_at_is_normalized_once(tmp_path):
+    db = tmp_path / "old-default.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE applications (id INTEGER PRIMARY KEY, application_id VARCHAR UNIQUE NOT NULL, "
+            "features JSON NOT NULL, decision VARCHAR, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO applications (application_id, features, created_at) "
+                     "VALUES ('before', '{}', '2024-02-01 00:00:00')")
+    engine = create_engine(f"sqlite:///{db}")
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+    engine.dispose()
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        # The old default still applies, but the trigger rewrites what it stores
+        conn.execute("INSERT INTO applications (application_id, features) VALUES ('after', '{}')")
+        created = dict(conn.execute("SELECT application_id, created_at FROM applications"))
+    assert created["before"] == "2024-02-01 00:00:00.000000"
+    assert len(created["after"]) == 26
+
+def test_default_created_at_matches_bound_format(client):
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("INSERT INTO applications (application_id, features) VALUES ('fmt-default', '{}')")
+        [created_at] = conn.execute(
+            "SELECT created_at FROM applications WHERE application_id = 'fmt-default'"
+        ).fetchone()
+    # Same shape as a datetime bound by SQLAlchemy, so a row created at a
+    # filter's exact bound is on the right side of it
+    datetime.datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S.%f")
+    assert len(created_at) == 26
+    resp = client.get(
+        "/applications", params={"created_after": created_at.replace(" ", "T"), "limit": 1000}, headers=API_HEADERS
+    )
+    assert "fmt-default" in {row["application_id"] for row in resp.json()["items"]}
+
+def test_export_parquet(client, listed):
+    pq = pytest.importorskip("pyarrow.parquet")
+    resp = client.get("/applications/export", params={"group": "list-A", "format": "parquet"}, headers=API_HEADERS)
+    assert resp.status_code == 200
+    table = pq.read_table(io.BytesIO(resp.content))
+    assert table.column("application_id").to_pylist() == [f"list-{i}" for i in (1, 3, 5, 7, 9)]
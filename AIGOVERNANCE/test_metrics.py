@@ -0,0 +1,14 @@
+from conftest import API_HEADERS
+
+def test_metrics_exposes_route_and_stage_latency(client):
+    client.get(
+        "/bias/disparate-impact",
+        params={"privileged": "m", "unprivileged": "f"},
+        headers=API_HEADERS
+    )
+    body = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/bias/disparate-impact",status="200"}' in body
+    assert 'stage_duration_seconds_count{stage="db_fetch"}' in body
+    assert "job_workers_total 2.0" in body
+    assert "# TYPE db_pool_checked_out gauge" in body
@@ -0,0 +1,49 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import ProfilingMiddleware, list_profiles, profile_path
+
+def _busy_app():
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, api_key="test-key", sample_rate=0.0)
+    return app
+
+def test_profile_captured_only_when_requested(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    client = TestClient(_busy_app())
+
+    plain = client.get("/work")
+    assert "x-profile" not in plain.headers
+    assert list_profiles() == []
+
+    # The header alone is ignored without the API key
+    anonymous = client.get("/work", headers={"x-profile": "1"})
+    assert "x-profile" not in anonymous.headers
+    wrong_key = client.get("/work", headers={"x-profile": "1", "x-api-key": "nope"})
+    assert "x-profile" not in wrong_key.headers
+    assert list_profiles() == []
+
+    profiled = client.get("/work", headers={"x-profile": "1", "x-api-key": "test-key"})
+    profile_id = profiled.headers["x-profile"]
+    [meta] = list_profiles()
+    assert meta["id"] == profile_id
+    assert meta["path"] == "/work"
+    assert meta["scope"] == "process"
+
+    collapsed = profile_path(profile_id).read_text(encoding="utf-8")
+    assert "work (test_profiling.py" in collapsed
+
+def test_unknown_profile_not_found(client):
+    from conftest import API_HEADERS
+    assert client.get("/admin/profiles/nope", headers=API_HEADERS).status_code == 404
@@ -0,0 +1,100 @@
+import sqlite3
+import datetime
+
+from conftest import API_HEADERS, DB_PATH
+
+def _ago(**delta) -> str:
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return (now - datetime.timedelta(**delta)).isoformat()
+
+def _run(prompt_id, i, passed, trust=0.9, hallucination=False, pattern=None, created_at=None):
+    run = {
+        "run_id": f"{prompt_id}-{i}",
+        "prompt_id": prompt_id,
+        "passed": passed,
+        "trust_score": trust,
+        "hallucination": hallucination,
+        "failure_pattern": pattern,
+    }
+    if created_at is not None:
+        run["created_at"] = created_at
+    return run
+
+def test_prompt_metrics_are_aggregated_per_prompt(client):
+    runs = [_run("pm-good", i, True) for i in range(12)]
+    runs += [
+        _run("pm-bad", i, i % 2 == 0, trust=0.6, hallucination=i < 3,
+             pattern=None if i % 2 == 0 else ("hallucinated source" if i < 8 else "format error"))
+        for i in range(12)
+    ]
+    # Outside the default window
+    runs.append(_run("pm-bad", 99, False, created_at=_ago(days=3)))
+    runs[0]["prompt_text"] = "Be accurate."
+
+    resp = client.post("/prompt-runs", json={"runs": runs}, headers=API_HEADERS)
+    assert resp.status_code == 200
+    assert resp.json() == {"inserted": 25, "skipped": 0}
+    # Re-sending a batch skips the runs already stored
+    resp = client.post("/prompt-runs", json={"runs": runs[:5]}, headers=API_HEADERS)
+    assert resp.json() == {"inserted": 0, "skipped": 5}
+
+    metrics = client.get("/prompt-metrics", headers=API_HEADERS).json()
+    by_id = {m["prompt_id"]: m for m in metrics}
+    good, bad = by_id["pm-good"], by_id["pm-bad"]
+
+    assert good["prompt_text"] == "Be accurate."
+    assert (good["passes"], good["failures"], good["total_runs"]) == (12, 0, 12)
+    assert good["needs_optimization"] is False
+
+    assert (bad["passes"], bad["failures"], bad["hallucinations"], bad["total_runs"]) == (6, 6, 3, 12)
+    assert bad["pass_rate"] == 0.5
+    assert abs(bad["trust_score"] - 0.6) < 1e-9
+    assert bad["hallucination_rate"] == 0.25
+    assert bad["needs_optimization"] is True
+    assert bad["failure_patterns"] == [
+        {"pattern": "hallucinated source", "count": 4},
+        {"pattern": "format error", "count": 2},
+    ]
+    # Worst pass rate first
+    assert metrics.index(bad) < metrics.index(good)
+
+    flagged = client.get("/prompt-metrics", params={"needs_optimization": True}, headers=API_HEADERS).json()
+    assert "pm-bad" in {m["prompt_id"] for m in flagged}
+    assert "pm-good" not in {m["prompt_id"] for m in flagged}
+
+    wide = client.get(
+        "/prompt-metrics", params={"prompt_id": "pm-bad", "since": _ago(days=4)}, headers=API_HEADERS
+    ).json()
+    assert [m["total_runs"] for m in wide] == [13]
+
+def test_prompt_regressions_compare_pass_rate_around_deployment(client):
+    deployed_at = _ago(hours=6)
+    runs = []
+    for prompt_id, before, after in (("pr-worse", 9, 5), ("pr-flat", 6, 6), ("pr-better", 5, 9)):
+        runs += [_run(prompt_id, i, i < before, created_at=_ago(hours=12, minutes=i)) for i in range(10)]
+        runs += [_run(prompt_id, 100 + i, i < after, created_at=_ago(hours=3, minutes=i)) for i in range(10)]
+    assert client.post("/prompt-runs", json={"runs": runs}, headers=API_HEADERS).status_code == 200
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO prompt_deployments (deployment_id, prompt_id, deployed_version, deployment_type, "
+            "deployed_at, status, expected_improvement) VALUES (?, ?, 'v2', 'ab_test', ?, 'active', ?)",
+            [
+                ("dep-worse", "pr-worse", deployed_at, 0.1),
+                ("dep-flat", "pr-flat", deployed_at, 0.1),
+                ("dep-better", "pr-better", deployed_at, 0.1),
+            ]
+        )
+
+    alerts = client.get("/prompt-metrics/regressions", headers=API_HEADERS).json()
+    found = {(a["deployment_id"], a["type"]) for a in alerts}
+    assert ("dep-worse", "performance_regression") in found
+    assert ("dep-worse", "underperforming_optimization") in found
+    assert ("dep-flat", "underperforming_optimization") in found
+    assert ("dep-flat", "performance_regression") not in found
+    assert not any(dep == "dep-better" for dep, _ in found)
+
+    worse = next(a for a in alerts if a["type"] == "performance_regression" and a["deployment_id"] == "dep-worse")
+    assert abs(worse["actual_improvement"] + 0.4) < 1e-9
+    assert worse["severity"] == "high"
+    assert worse["message"] == "Prompt pr-worse showing -40.0% performance decline"
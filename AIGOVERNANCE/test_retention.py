@@ -0,0 +1,173 @@
+import os
+import json
+import math
+import asyncio
+import sqlite3
+import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from conftest import API_HEADERS, DB_PATH
+from database import enable_sqlite_pragmas
+from models import Base
+from retention import roll_partitions, approval_counts_by_group, compact, archive_path, claim_lease
+
+NOW = datetime.datetime(2025, 6, 15, 12, 0)
+
+def _make_db(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    enable_sqlite_pragmas(engine)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    return engine, factory
+
+def _seed(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO applications (application_id, features, decision, created_at) VALUES (?, ?, ?, ?)",
+            [(app_id, json.dumps(features), decision, created_at) for app_id, features, decision, created_at in rows]
+        )
+
+def test_roll_partitions_keeps_fairness_history(tmp_path):
+    db = tmp_path / "retention.db"
+    archive_dir = tmp_path / "archive"
+    rows = []
+    # Two expired months, one kept month, and one row without a timestamp
+    for month, day_count in (("2025-01", 7), ("2025-02", 5), ("2025-05", 4)):
+        for i in range(day_count):
+            grp = "A" if i % 2 else "B"
+            decision = "approved" if i % 3 else "denied"
+            rows.append((f"{month}-{i}", {"group": grp}, decision, f"{month}-{i + 1:02d} 10:00:00"))
+    rows.append(("ungrouped", {}, "approved", "2025-01-03 00:00:00"))
+    rows.append(("undated", {"group": "A"}, "approved", None))
+
+    async def run():
+        engine, factory = _make_db(db)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        _seed(db, rows)
+        async with factory() as session:
+            before = await approval_counts_by_group(session)
+        first = await roll_partitions(factory, hot_months=2, batch_size=3, archive_dir=str(archive_dir), now=NOW)
+        again = await roll_partitions(factory, hot_months=2, batch_size=3, archive_dir=str(archive_dir), now=NOW)
+        async with factory() as session:
+            after = await approval_counts_by_group(session)
+        await engine.dispose()
+        return before, first, again, after
+
+    before, first, again, after = asyncio.run(run())
+
+    assert first["cutoff"] == "2025-04-01T00:00:00"
+    assert first["months"] == {"2025-01": 8, "2025-02": 5}
+    assert again["rolled"] == 0
+    assert after == before
+
+    with sqlite3.connect(db) as conn:
+        remaining = {r[0] for r in conn.execute("SELECT application_id FROM applications")}
+        summaries = conn.execute(
+            "SELECT month, grp, total, approved, denied FROM application_summaries ORDER BY month, grp"
+        ).fetchall()
+    assert remaining == {f"2025-05-{i}" for i in range(4)} | {"undated"}
+    assert summaries == [
+        ("2025-01", "A", 3, 2, 1),
+        ("2025-01", "B", 4, 2, 2),
+        ("2025-02", "A", 2, 1, 1),
+        ("2025-02", "B", 3, 2, 1),
+    ]
+
+    with sqlite3.connect(archive_path(str(archive_dir), "2025-01")) as conn:
+        archived = conn.execute("SELECT application_id, created_at FROM applications").fetchall()
+    assert len(archived) == 8
+    assert ("ungrouped", "2025-01-03 00:00:00") in archived
+
+def test_compact_returns_free_pages(tmp_path):
+    db = tmp_path / "compact.db"
+
+    async def run():
+        engine, factory = _make_db(db)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        _seed(db, [
+            (f"bulk-{i}", {"group": "A", "pad": "x" * 500}, None, "2025-01-01 00:00:00")
+            for i in range(2000)
+        ])
+        with sqlite3.connect(db) as conn:
+            conn.execute("DELETE FROM applications")
+            conn.commit()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        size_before = os.path.getsize(db)
+        result = await compact(engine, step_pages=64)
+        await engine.dispose()
+        return free_before, size_before, result
+
+    free_before, size_before, result = asyncio.run(run())
+
+    assert free_before > 64
+    assert result["incremental"] is True
+    assert result["freed_pages"] == free_before
+    assert result["vacuum_steps"] == math.ceil(free_before / 64)
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert os.path.getsize(db) < size_before / 4
+
+def test_one_worker_holds_the_maintenance_lease(tmp_path):
+    async def run():
+        engine, factory = _make_db(tmp_path / "lease.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        claims = [
+            await claim_lease(factory, "worker-1", 60, now=NOW),
+            await claim_lease(factory, "worker-2", 60, now=NOW),
+            # The holder renews
+            await claim_lease(factory, "worker-1", 60, now=NOW + datetime.timedelta(seconds=30)),
+            await claim_lease(factory, "worker-2", 60, now=NOW + datetime.timedelta(seconds=60)),
+            # Lapsed: another worker takes over
+            await claim_lease(factory, "worker-2", 60, now=NOW + datetime.timedelta(seconds=90)),
+            await claim_lease(factory, "worker-1", 60, now=NOW + datetime.timedelta(seconds=100)),
+        ]
+        await engine.dispose()
+        return claims
+
+    assert asyncio.run(run()) == [True, False, True, False, True, False]
+
+def test_disparate_impact_includes_rolled_up_months(client, seed_applications):
+    seed_applications([
+        ("ret-p1", {"group": "ret-priv"}, "approved"),
+        ("ret-u1", {"group": "ret-unpriv"}, "denied"),
+    ])
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            "INSERT INTO application_summaries (month, grp, total, approved, denied) VALUES (?, ?, ?, ?, ?)",
+            [("2020-01", "ret-priv", 3, 1, 2), ("2020-01", "ret-unpriv", 3, 1, 2)]
+        )
+    resp = client.get(
+        "/bias/disparate-impact",
+        params={"privileged": "ret-priv", "unprivileged": "ret-unpriv"},
+        headers=API_HEADERS
+    )
+    assert resp.status_code == 200
+    # (1 / 4) / (2 / 4)
+    assert resp.json()["ratio"] == 0.5
+
+def test_shutdown_flushes_ingest_buffer_when_startup_stopped_early():
+    from starlette.datastructures import State
+    import main
+
+    class Recorder:
+        stopped = False
+
+        async def stop(self):
+            self.stopped = True
+
+    saved = main.app.state
+    buffer = Recorder()
+    main.app.state = State()
+    # Startup failed before the job queue and maintenance were started
+    main.app.state.ingest_buffer = buffer
+    try:
+        asyncio.run(main.on_shutdown())
+    finally:
+        main.app.state = saved
+    assert buffer.stopped
@@ -0,0 +1,44 @@
+def test_health_needs_no_api_key(client):
+    resp = client.get("/health")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["status"] == "ok"
+    assert body["preloaded"] is False
+    assert body["model_loaded"] is True
+
+def test_preloaded_worker_reuses_master_model(client, monkeypatch):
+    from starlette.datastructures import State
+    import jobs
+    import main
+    import serving
+    import tools
+
+    def not_in_a_worker(*args, **kwargs):
+        raise AssertionError("a preloaded worker must not redo the master's setup")
+
+    saved_state = main.app.state
+    saved_tools = {name: getattr(tools, name) for name in ("explainer", "explanations", "counterfactuals", "ingest_buffer")}
+    monkeypatch.setattr(serving, "preloaded", True)
+    monkeypatch.setattr(serving, "model", saved_state.model)
+    monkeypatch.setattr(serving, "explainer", saved_state.explainer)
+    monkeypatch.setattr(serving, "version", "preloaded-version")
+    monkeypatch.setattr(main, "init_db", not_in_a_worker)
+    monkeypatch.setattr(main, "load_model_and_explainer", not_in_a_worker)
+    monkeypatch.setattr(jobs, "recover_interrupted_jobs", not_in_a_worker)
+
+    main.app.state = State()
+    try:
+        client.portal.call(main.on_startup)
+        assert main.app.state.model is serving.model
+        assert main.app.state.explainer is serving.explainer
+        assert tools.explainer is serving.explainer
+        assert main.app.state.explanations.model_version == "preloaded-version"
+        assert main.app.state.jobs is not None
+        body = client.get("/health").json()
+        assert body["preloaded"] is True
+        assert body["model_loaded"] is True
+    finally:
+        client.portal.call(main.on_shutdown)
+        main.app.state = saved_state
+        for name, value in saved_tools.items():
+            setattr(tools, name, value)
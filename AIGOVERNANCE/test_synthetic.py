@@ -0,0 +1,51 @@
+import json
+import uuid
+import sqlite3
+
+from features import FEATURE_SCHEMA
+from synthetic_loan_generator import generate_applications, iter_chunks, main
+
+def test_same_seed_and_chunk_size_reproduce_the_data():
+    first = list(iter_chunks(1000, chunk_size=300, seed=7))
+    second = list(iter_chunks(1000, chunk_size=300, seed=7))
+    assert [len(df) for df in first] == [300, 300, 300, 100]
+    assert all(a.equals(b) for a, b in zip(first, second))
+
+def test_ids_are_valid_uuid4():
+    ids = generate_applications(500, seed=1)["application_id"]
+    assert ids.is_unique
+    assert all(uuid.UUID(value).version == 4 and str(uuid.UUID(value)) == value for value in ids)
+
+def test_injected_bias_shows_up_in_approval_rates():
+    df = generate_applications(20000, seed=2, approval_rate=0.8, bias={"sex": {"Female": 0.5}})
+    rates = df.groupby("sex")["approval_decision"].mean()
+    assert abs(rates["Male"] - 0.8) < 0.02
+    assert abs(rates["Female"] - 0.4) < 0.02
+
+def test_db_load_produces_service_features(tmp_path):
+    db = tmp_path / "synthetic.db"
+    main(["--rows", "250", "--chunk-size", "100", "--seed", "3", "--format", "db",
+          "--database-url", f"sqlite+aiosqlite:///{db}", "--group-attribute", "race"])
+
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute("SELECT features, decision FROM applications").fetchall()
+    assert len(rows) == 250
+    features = [json.loads(f) for f, _ in rows]
+    assert {d for _, d in rows} <= {"approved", "denied"}
+    assert all(f["group"] == f["race"] for f in features)
+    for f in features:
+        FEATURE_SCHEMA.validate(f)
+
+def test_ndjson_chunks_have_no_blank_lines(tmp_path):
+    path = tmp_path / "synthetic.json"
+    main(["--rows", "250", "--chunk-size", "100", "--seed", "3", "--format", "ndjson", "--output", str(path)])
+
+    lines = path.read_text(encoding="utf-8").split("\n")
+    assert lines[-1] == ""
+    records = [json.loads(line) for line in lines[:-1]]
+    assert len(records) == 250
+
+def test_categories_match_the_feature_schema():
+    df = generate_applications(500, seed=1)
+    spec = {field["name"]: field for field in FEATURE_SCHEMA.spec}
+    assert set(df["loan_purpose"]) == set(spec["loan_purpose"]["categories"])
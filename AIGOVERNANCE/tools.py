@@ -1,155 +1,262 @@
-import os
-import json
-import asyncio
-from starlette.concurrency import run_in_threadpool
-from openai import OpenAI
-from fastapi import HTTPException
-from sqlalchemy import text
-import numpy as np
-
-from config import (
-    SQL_COUNT_APPLICATIONS_BY_GROUP,
-    SQL_COUNT_APPROVED_BY_GROUP,
-    SQL_SELECT_FEATURES_BY_ID,
-    SYSTEM_PROMPT,
-    FEATURE_ORDER
-)
-from schemas import IngestRequest, DisparateImpactRequest, ExplainRequest
-from database import AsyncSessionLocal
-from model import Application as ApplicationModel
-
-# ─── LLM Configuration ───
-LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30.0"))
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-FUNCTIONS = [
-    {
-        "name": "ingest_application",
-        "description": "Ingest a new loan application",
-        "parameters": IngestRequest.schema()
-    },
-    {
-        "name": "disparate_impact",
-        "description": "Compute disparate impact ratio",
-        "parameters": DisparateImpactRequest.schema()
-    },
-    {
-        "name": "explain_application",
-        "description": "Return SHAP-based contributions for each feature",
-        "parameters": ExplainRequest.schema()
-    }
-]
-
-# Module‐level explainer, set in main.py startup
-explainer = None
-
-async def call_tool(name: str, args: dict):
-    """
-    Dispatch tools: database operations and LLM orchestration.
-    """
-    # ----- Ingest application -----
-    if name == "ingest_application":
-        async with AsyncSessionLocal() as session:
-            app_model = ApplicationModel(
-                application_id=args.get("application_id"),
-                features=args.get("features"),
-                decision=None
-            )
-            session.add(app_model)
-            try:
-                await session.commit()
-            except Exception:
-                await session.rollback()
-        return {"status": "success"}
-
-    # ----- Disparate impact calculation -----
-    if name == "disparate_impact":
-        priv = args.get("privileged")
-        unpriv = args.get("unprivileged")
-        async with AsyncSessionLocal() as session:
-            total_priv = (await session.execute(
-                text(SQL_COUNT_APPLICATIONS_BY_GROUP), {"grp": priv}
-            )).scalar() or 0
-            total_unpriv = (await session.execute(
-                text(SQL_COUNT_APPLICATIONS_BY_GROUP), {"grp": unpriv}
-            )).scalar() or 0
-            hired_priv = (await session.execute(
-                text(SQL_COUNT_APPROVED_BY_GROUP), {"grp": priv}
-            )).scalar() or 0
-            hired_unpriv = (await session.execute(
-                text(SQL_COUNT_APPROVED_BY_GROUP), {"grp": unpriv}
-            )).scalar() or 0
-        rate_priv = hired_priv / total_priv if total_priv else 0
-        rate_unpriv = hired_unpriv / total_unpriv if total_unpriv else 0
-        ratio = rate_unpriv / rate_priv if rate_priv else 0
-        return {"ratio": ratio}
-
-    # ----- SHAP explanation -----
-    if name == "explain_application":
-        if explainer is None:
-            raise HTTPException(status_code=503, detail="Explanation service unavailable")
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                text(SQL_SELECT_FEATURES_BY_ID),
-                {"id": args.get("application_id")}
-            )
-            row = result.first()
-            if not row:
-                raise HTTPException(status_code=404, detail="Application not found")
-            raw = row[0]
-
-        try:
-            features = json.loads(raw) if isinstance(raw, str) else raw
-        except ValueError:
-            raise HTTPException(status_code=500, detail="Invalid features JSON")
-
-        x = [features.get(k, 0) for k in FEATURE_ORDER]
-        X = np.array([x])
-        shap_values = await run_in_threadpool(explainer.shap_values, X)
-        contributions = {k: float(v) for k, v in zip(FEATURE_ORDER, shap_values[0])}
-        return {"contributions": contributions}
-
-    # ----- LLM agent dispatch -----
-    if name == "agent_dispatch":
-        messages = args.get("messages", [])
-        try:
-            first_resp = await asyncio.wait_for(
-                run_in_threadpool(lambda: client.chat.completions.create(
-                    model="gpt-4",
-                    messages=messages,
-                    functions=FUNCTIONS,
-                    function_call="auto"
-                )),
-                timeout=LLM_TIMEOUT
-            )
-        except asyncio.TimeoutError:
-            raise HTTPException(
-                status_code=504,
-                detail=f"LLM request timed out after {LLM_TIMEOUT} seconds"
-            )
-
-        message = first_resp.choices[0].message
-        if message.function_call:
-            fn_name = message.function_call.name
-            fn_args = json.loads(message.function_call.arguments or "{}")
-            tool_result = await call_tool(fn_name, fn_args)
-
-            followup = [
-                {"role": "system",   "content": SYSTEM_PROMPT},
-                {"role": "function", "name": fn_name, "content": json.dumps(tool_result)}
-            ]
-            second_resp = await asyncio.wait_for(
-                run_in_threadpool(lambda: client.chat.completions.create(
-                    model="gpt-4",
-                    messages=followup
-                )),
-                timeout=LLM_TIMEOUT
-            )
-            return {
-                "response": second_resp.choices[0].message.content,
-                "tool_result": tool_result
-            }
-
-        return {"response": message.content, "tool_result": None}
-
-    raise ValueError(f"Unknown tool: {name}")
+import os
+import json
+import asyncio
+import logging
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from config import (
+    SQL_SELECT_FEATURES_BY_ID,
+    SYSTEM_PROMPT,
+    COUNTERFACTUAL_TIME_BUDGET_MS,
+    COUNTERFACTUAL_MAX_TIME_BUDGET_MS,
+    EXPLAIN_DEFAULT_MODE
+)
+from schemas import (
+    IngestRequest,
+    DisparateImpactRequest,
+    ExplainRequest,
+    FeatureImportanceRequest,
+    CounterfactualRequest
+)
+from database import AsyncSessionLocal
+from model import Application as ApplicationModel
+from metrics import stage_timer
+from features import FEATURE_SCHEMA, FeatureValidationError
+from importance import load_summary, safe_record_explanations
+from explanations import MODES
+from retention import approval_counts
+
+logger = logging.getLogger(__name__)
+
+# ─── LLM Configuration ───
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30.0"))
+# Created on first agent call; importing the OpenAI SDK is slow
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return client
+
+FUNCTIONS = [
+    {
+        "name": "ingest_application",
+        "description": "Ingest a new loan application",
+        "parameters": IngestRequest.schema()
+    },
+    {
+        "name": "disparate_impact",
+        "description": "Compute disparate impact ratio",
+        "parameters": DisparateImpactRequest.schema()
+    },
+    {
+        "name": "explain_application",
+        "description": "Return SHAP-based contributions for each feature",
+        "parameters": ExplainRequest.schema()
+    },
+    {
+        "name": "feature_importance_summary",
+        "description": "Mean absolute SHAP contribution per feature, overall and per group",
+        "parameters": FeatureImportanceRequest.schema()
+    },
+    {
+        "name": "counterfactual",
+        "description": "Find the smallest feature changes that would flip an application's decision",
+        "parameters": CounterfactualRequest.schema()
+    }
+]
+
+# Module‐level explainer, explanation modes and counterfactual search, set in main.py startup
+explainer = None
+explanations = None
+counterfactuals = None
+# Write-behind ingest buffer, set in main.py startup when INGEST_WRITE_BEHIND is on
+ingest_buffer = None
+
+async def call_tool(name: str, args: dict):
+    """
+    Dispatch tools: database operations and LLM orchestration.
+    """
+    # ----- Ingest application -----
+    if name == "ingest_application":
+        try:
+            FEATURE_SCHEMA.validate(args.get("features"))
+        except FeatureValidationError as e:
+            return {"status": "rejected", "errors": e.errors}
+        application_id = args.get("application_id")
+        if not isinstance(application_id, str) or not application_id:
+            return {"status": "rejected", "errors": ["application_id must be a non-empty string"]}
+        if ingest_buffer is not None:
+            try:
+                await ingest_buffer.submit(application_id, args.get("features"))
+            except Exception:
+                # As on the direct path below: a failed insert is not reported to the agent
+                logger.warning("Ingest of %s failed", application_id, exc_info=True)
+            return {"status": "success"}
+        async with AsyncSessionLocal() as session:
+            app_model = ApplicationModel(
+                application_id=application_id,
+                features=args.get("features"),
+                decision=None
+            )
+            session.add(app_model)
+            try:
+                await session.commit()
+            except Exception:
+                await session.rollback()
+        return {"status": "success"}
+
+    # ----- Disparate impact calculation -----
+    if name == "disparate_impact":
+        priv = args.get("privileged")
+        unpriv = args.get("unprivileged")
+        async with AsyncSessionLocal() as session:
+            with stage_timer("db_fetch"):
+                total_priv, hired_priv = await approval_counts(session, priv)
+                total_unpriv, hired_unpriv = await approval_counts(session, unpriv)
+        rate_priv = hired_priv / total_priv if total_priv else 0
+        rate_unpriv = hired_unpriv / total_unpriv if total_unpriv else 0
+        ratio = rate_unpriv / rate_priv if rate_priv else 0
+        return {"ratio": ratio}
+
+    # ----- SHAP explanation -----
+    if name == "explain_application":
+        if explanations is None:
+            raise HTTPException(status_code=503, detail="Explanation service unavailable")
+        explanations.refresh(AsyncSessionLocal)
+        async with AsyncSessionLocal() as session:
+            with stage_timer("db_fetch"):
+                result = await session.execute(
+                    text(SQL_SELECT_FEATURES_BY_ID),
+                    {"id": args.get("application_id")}
+                )
+                row = result.first()
+            if not row:
+                raise HTTPException(status_code=404, detail="Application not found")
+            raw = row[0]
+
+        try:
+            with stage_timer("json_decode"):
+                features = json.loads(raw) if isinstance(raw, str) else raw
+        except ValueError:
+            raise HTTPException(status_code=500, detail="Invalid features JSON")
+
+        try:
+            with stage_timer("vectorize"):
+                X = FEATURE_SCHEMA.to_vector(features)
+        except FeatureValidationError:
+            raise HTTPException(status_code=500, detail="Invalid stored features")
+        try:
+            mode = explanations.select(1, args.get("mode"), args.get("latency_budget_ms"))
+        except ValueError as e:
+            return {"status": "rejected", "errors": [str(e)]}
+        with stage_timer("shap_values"):
+            values = await run_in_threadpool(explanations.shap_values, X, mode)
+        contributions = FEATURE_SCHEMA.contributions(values[0])
+        await safe_record_explanations(
+            AsyncSessionLocal, [(args.get("application_id"), features, values[0])], explanations.model_version, mode
+        )
+        return {"contributions": contributions, "mode": mode, "error_bound": explanations.error_bound(mode)}
+
+    # ----- Counterfactual search -----
+    if name == "counterfactual":
+        if counterfactuals is None:
+            raise HTTPException(status_code=503, detail="Counterfactual service unavailable")
+        # Agent input is untyped; coerce and bound it as the HTTP endpoint does
+        try:
+            req = CounterfactualRequest(**args)
+        except ValidationError as e:
+            return {
+                "status": "rejected",
+                "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+            }
+        async with AsyncSessionLocal() as session:
+            with stage_timer("db_fetch"):
+                row = (await session.execute(
+                    text(SQL_SELECT_FEATURES_BY_ID),
+                    {"id": req.application_id}
+                )).first()
+            if not row:
+                raise HTTPException(status_code=404, detail="Application not found")
+            raw = row[0]
+
+        try:
+            features = json.loads(raw) if isinstance(raw, str) else raw
+            X = FEATURE_SCHEMA.to_vector(features)
+        except (ValueError, FeatureValidationError):
+            raise HTTPException(status_code=500, detail="Invalid stored features")
+        budget = min(req.time_budget_ms or COUNTERFACTUAL_TIME_BUDGET_MS, COUNTERFACTUAL_MAX_TIME_BUDGET_MS)
+        try:
+            with stage_timer("counterfactual_search"):
+                return await run_in_threadpool(
+                    counterfactuals.search, X[0], budget, req.desired_class, req.max_results, req.seed
+                )
+        except ValueError as e:
+            return {"status": "rejected", "errors": [str(e)]}
+
+    # ----- Feature importance summary -----
+    if name == "feature_importance_summary":
+        if explanations is None:
+            raise HTTPException(status_code=503, detail="Explanation service unavailable")
+        mode = args.get("mode") or EXPLAIN_DEFAULT_MODE
+        if mode not in MODES:
+            return {
+                "status": "rejected",
+                "errors": [f"Unknown explanation mode {mode!r}; expected one of {', '.join(MODES)}"]
+            }
+        async with AsyncSessionLocal() as session:
+            with stage_timer("db_fetch"):
+                return await load_summary(session, explanations.model_version, mode, args.get("groups"))
+
+    # ----- LLM agent dispatch -----
+    if name == "agent_dispatch":
+        messages = args.get("messages", [])
+        llm = get_client()
+        try:
+            with stage_timer("llm_call"):
+                first_resp = await asyncio.wait_for(
+                    run_in_threadpool(lambda: llm.chat.completions.create(
+                        model="gpt-4",
+                        messages=messages,
+                        functions=FUNCTIONS,
+                        function_call="auto"
+                    )),
+                    timeout=LLM_TIMEOUT
+                )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail=f"LLM request timed out after {LLM_TIMEOUT} seconds"
+            )
+
+        message = first_resp.choices[0].message
+        if message.function_call:
+            fn_name = message.function_call.name
+            fn_args = json.loads(message.function_call.arguments or "{}")
+            tool_result = await call_tool(fn_name, fn_args)
+
+            followup = [
+                {"role": "system",   "content": SYSTEM_PROMPT},
+                {"role": "function", "name": fn_name, "content": json.dumps(tool_result)}
+            ]
+            with stage_timer("llm_call"):
+                second_resp = await asyncio.wait_for(
+                    run_in_threadpool(lambda: llm.chat.completions.create(
+                        model="gpt-4",
+                        messages=followup
+                    )),
+                    timeout=LLM_TIMEOUT
+                )
+            return {
+                "response": second_resp.choices[0].message.content,
+                "tool_result": tool_result
+            }
+
+        return {"response": message.content, "tool_result": None}
+
+    raise ValueError(f"Unknown tool: {name}")